@@ -5,71 +5,307 @@ Implements intent classification, tone analysis, and natural language generation
 
 import re
 import random
+import functools
+import hashlib
+import threading
+from collections import Counter, OrderedDict
 from datetime import datetime
 import requests
 import json
 
 from config import Config
 
+# Matches word-boundary literal patterns such as r'\bthank you\b' or r'\bdon\'t understand\b'
+LITERAL_PATTERN = re.compile(r"^\\b((?:[\w ]|\\')+)\\b$")
+
+# Number of distinct (subject, body) analyses kept per EmailAI instance
+ANALYSIS_CACHE_SIZE = 1024
+
+OLLAMA_URL = 'http://localhost:11434/api/generate'
+
+# Sender-name patterns; sign-offs sit at the end of a message and introductions at the start,
+# so each is only searched within NAME_SEARCH_LINES lines of its end of the body
+SIGNOFF_NAME_PATTERN = re.compile(r'(?:regards|sincerely|thanks|cheers),?\s+([A-Z][a-z]+)')
+INTRO_NAME_PATTERN = re.compile(r'([A-Z][a-z]+)\s+(?:here|speaking|writing)')
+NAME_SEARCH_LINES = 6
+
 class EmailAI:
     """Custom AI engine for intelligent email response generation"""
     
+    # Intent keywords and patterns
+    intent_patterns = {
+        'question': [
+            r'\?', r'\bwhat\b', r'\bwhen\b', r'\bwhere\b', r'\bwho\b', 
+            r'\bwhy\b', r'\bhow\b', r'\bcould you\b', r'\bcan you\b',
+            r'\bwould you\b', r'\bdo you\b', r'\bis there\b', r'\bare there\b'
+        ],
+        'request': [
+            r'\bplease\b', r'\bcould you\b', r'\bwould you\b', r'\bcan you\b',
+            r'\bneed\b', r'\brequire\b', r'\bwant\b', r'\bwish\b',
+            r'\bsend me\b', r'\bprovide\b', r'\bshare\b'
+        ],
+        'complaint': [
+            r'\bproblem\b', r'\bissue\b', r'\berror\b', r'\bwrong\b',
+            r'\bnot working\b', r'\bfailed\b', r'\bdisappointed\b',
+            r'\bunhappy\b', r'\bfrustrated\b', r'\bterrible\b'
+        ],
+        'support': [
+            r'\bhelp\b', r'\bsupport\b', r'\bassist\b', r'\bguide\b',
+            r'\btrouble\b', r'\bconfused\b', r'\bdon\'t understand\b'
+        ],
+        'casual': [
+            r'\bhey\b', r'\bhi\b', r'\bhello\b', r'\bthanks\b',
+            r'\bthank you\b', r'\bappreciate\b', r'\bcheers\b'
+        ],
+        'urgent': [
+            r'\burgent\b', r'\basap\b', r'\bimmediately\b', r'\bquickly\b',
+            r'\bright away\b', r'\bas soon as possible\b', r'\bpriority\b'
+        ]
+    }
+    
+    # Keyword extraction categories
+    topic_keywords = {
+        'technical': [r'\berror\b', r'\bbug\b', r'\bfix\b', r'\blogin\b', r'\bpassword\b', r'\baccess\b', r'\bweb\b', r'\bapp\b', r'\bserver\b'],
+        'billing': [r'\binvoice\b', r'\bpayment\b', r'\bbilling\b', r'\bpricing\b', r'\bcost\b', r'\bcharge\b', r'\brefund\b'],
+        'general': [r'\binformation\b', r'\bdetails\b', r'\bquestion\b', r'\bhelp\b', r'\bstatus\b', r'\bupdate\b'],
+        'scheduling': [r'\bmeeting\b', r'\bschedule\b', r'\bcalendar\b', r'\bappointment\b', r'\btime\b', r'\bdate\b']
+    }
+    
+    # Tone indicators
+    tone_indicators = {
+        'formal': [
+            r'\bdear\b', r'\bsincerely\b', r'\bregards\b', r'\brespectfully\b',
+            r'\bkindly\b', r'\bwould appreciate\b'
+        ],
+        'friendly': [
+            r'\bhey\b', r'\bhi\b', r'\bthanks\b', r'\bawesome\b',
+            r'\bgreat\b', r'\bcool\b', r'!', r'😊', r'👍'
+        ],
+        'professional': [
+            r'\bregarding\b', r'\bpursuant\b', r'\bfurthermore\b',
+            r'\bhowever\b', r'\btherefore\b', r'\brespectively\b'
+        ]
+    }
+    
     def __init__(self):
-        # Intent keywords and patterns
-        self.intent_patterns = {
-            'question': [
-                r'\?', r'\bwhat\b', r'\bwhen\b', r'\bwhere\b', r'\bwho\b', 
-                r'\bwhy\b', r'\bhow\b', r'\bcould you\b', r'\bcan you\b',
-                r'\bwould you\b', r'\bdo you\b', r'\bis there\b', r'\bare there\b'
-            ],
-            'request': [
-                r'\bplease\b', r'\bcould you\b', r'\bwould you\b', r'\bcan you\b',
-                r'\bneed\b', r'\brequire\b', r'\bwant\b', r'\bwish\b',
-                r'\bsend me\b', r'\bprovide\b', r'\bshare\b'
-            ],
-            'complaint': [
-                r'\bproblem\b', r'\bissue\b', r'\berror\b', r'\bwrong\b',
-                r'\bnot working\b', r'\bfailed\b', r'\bdisappointed\b',
-                r'\bunhappy\b', r'\bfrustrated\b', r'\bterrible\b'
-            ],
-            'support': [
-                r'\bhelp\b', r'\bsupport\b', r'\bassist\b', r'\bguide\b',
-                r'\btrouble\b', r'\bconfused\b', r'\bdon\'t understand\b'
-            ],
-            'casual': [
-                r'\bhey\b', r'\bhi\b', r'\bhello\b', r'\bthanks\b',
-                r'\bthank you\b', r'\bappreciate\b', r'\bcheers\b'
-            ],
-            'urgent': [
-                r'\burgent\b', r'\basap\b', r'\bimmediately\b', r'\bquickly\b',
-                r'\bright away\b', r'\bas soon as possible\b', r'\bpriority\b'
-            ]
+        # Compiled scanners are built once per class and shared by every instance
+        self._scan_buckets, self._vocab, self._scanner_re, self._residual = self._compiled_scanners()
+        self._topic_phrases = frozenset(
+            phrase for phrase, hits in self._vocab.items()
+            if any(bucket == 'topic' for bucket, _ in hits)
+        )
+        
+        # Response templates, formatted lazily by _pick so only the chosen one is built
+        self._contextual_templates = {
+            'question': (
+                "Thank you for reaching out with your question{topic_ref}. I've received your email and will get back to you with a detailed response shortly.",
+                "I appreciate your inquiry{topic_ref}. I'm currently reviewing the details and will provide you with a comprehensive answer as soon as possible."
+            ),
+            'request': (
+                "Thank you for your request{topic_ref}. I've noted the details and will process everything promptly.",
+                "I've received your message{topic_ref} and am currently looking into it for you."
+            ),
+            'complaint': (
+                "I sincerely apologize for the inconvenience regarding {issue}. Your concern is important, and I'm investigating this right away.",
+                "Thank you for bringing this situation{topic_ref} to my attention. I understand your frustration and am working to resolve it quickly."
+            ),
+            'support': (
+                "Thank you for reaching out for help with {inquiry}. I'm here to assist and will provide guidance shortly.",
+                "I've received your support request{topic_ref}. I'll get back to you with the technical details you need very soon."
+            ),
+            'casual': (
+                "Thanks for the email{topic_ref}! I've received your message and will get back to you soon.",
+                "Got your message{topic_ref}. I'll respond with more details shortly."
+            )
+        }
+        
+        self._named_greetings = {
+            'formal': ("Dear {sender},", "Hello {sender},"),
+            'friendly': ("Hi {sender}!", "Hey {sender}!", "Hello {sender}!"),
+            'professional': ("Hello {sender},", "Hi {sender},")
+        }
+        self._anonymous_greetings = {
+            'formal': ("Dear Sir/Madam,", "Hello,"),
+            'friendly': ("Hi there!", "Hey!", "Hello!"),
+            'professional': ("Hello,", "Hi,")
         }
         
-        # Keyword extraction categories
-        self.topic_keywords = {
-            'technical': [r'\berror\b', r'\bbug\b', r'\bfix\b', r'\blogin\b', r'\bpassword\b', r'\baccess\b', r'\bweb\b', r'\bapp\b', r'\bserver\b'],
-            'billing': [r'\binvoice\b', r'\bpayment\b', r'\bbilling\b', r'\bpricing\b', r'\bcost\b', r'\bcharge\b', r'\brefund\b'],
-            'general': [r'\binformation\b', r'\bdetails\b', r'\bquestion\b', r'\bhelp\b', r'\bstatus\b', r'\bupdate\b'],
-            'scheduling': [r'\bmeeting\b', r'\bschedule\b', r'\bcalendar\b', r'\bappointment\b', r'\btime\b', r'\bdate\b']
+        self._closings = {
+            'formal': (
+                "Sincerely,\nAI Assistant",
+                "Best regards,\nAI Assistant",
+                "Respectfully,\nAI Assistant"
+            ),
+            'friendly': (
+                "Cheers,\nAI Assistant",
+                "Best,\nAI Assistant",
+                "Talk soon,\nAI Assistant"
+            ),
+            'professional': (
+                "Best regards,\nAI Assistant",
+                "Kind regards,\nAI Assistant",
+                "Regards,\nAI Assistant"
+            )
+        }
+        
+        # Every (intent, tone) pair resolved to its template pools up front
+        self._plans = {
+            (intent, tone): self._build_plan(intent, tone)
+            for intent in self.intent_patterns
+            for tone in self.tone_indicators
+        }
+        
+        # Repeated (subject, body) pairs (list blasts, re-fetched mail) skip the text scan;
+        # entries are keyed by a digest so the cache never holds on to email bodies
+        self._analysis_cache = OrderedDict()
+        self._analysis_lock = threading.Lock()
+        
+        # Keep-alive HTTP session so Ollama queries reuse one connection
+        self._http = requests.Session()
+        self._http.headers.update({'Connection': 'keep-alive'})
+        
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _compiled_scanners(cls):
+        """
+        Build the scan buckets and compiled scanners for this class's pattern tables
+        
+        Cached per class, so every EmailAI instance in the process reuses the same objects.
+        
+        Returns:
+            tuple: (scan buckets, vocabulary, scanner regex, residual groups)
+        """
+        # Build a single-pass scanner over every intent/tone/topic pattern
+        scan_buckets = {
+            'intent': cls.intent_patterns,
+            'tone': cls.tone_indicators,
+            'topic': {
+                cls._literal_of(pattern): [pattern]
+                for patterns in cls.topic_keywords.values()
+                for pattern in patterns
+            },
+            # Punctuation tracked for context flags rather than scoring
+            'marks': {
+                'question': [r'\?']
+            }
         }
+        return (scan_buckets,) + cls._build_scanner(scan_buckets)
+
+    @staticmethod
+    def _literal_of(pattern):
+        """Return the plain phrase behind a word-boundary literal pattern, or None"""
+        match = LITERAL_PATTERN.match(pattern)
+        return match.group(1).replace("\\'", "'") if match else None
+
+    @classmethod
+    def _build_scanner(cls, buckets):
+        """
+        Combine all patterns into one alternation regex
+        
+        Literal word patterns share the named group "word"; every distinct
+        non-literal pattern (punctuation, emoji) gets its own named group.
         
-        # Tone indicators
-        self.tone_indicators = {
-            'formal': [
-                r'\bdear\b', r'\bsincerely\b', r'\bregards\b', r'\brespectfully\b',
-                r'\bkindly\b', r'\bwould appreciate\b'
-            ],
-            'friendly': [
-                r'\bhey\b', r'\bhi\b', r'\bthanks\b', r'\bawesome\b',
-                r'\bgreat\b', r'\bcool\b', r'!', r'😊', r'👍'
-            ],
-            'professional': [
-                r'\bregarding\b', r'\bpursuant\b', r'\bfurthermore\b',
-                r'\bhowever\b', r'\btherefore\b', r'\brespectively\b'
+        Args:
+            buckets: {bucket: {label: [pattern, ...]}} mapping
+            
+        Returns:
+            tuple: (phrase -> [(bucket, label), ...] vocabulary, compiled alternation,
+                    group name -> [(bucket, label), ...] for the non-literal patterns)
+        """
+        literal_hits = []
+        residual_hits = {}
+        for bucket, pattern_map in buckets.items():
+            for label, patterns in pattern_map.items():
+                for pattern in patterns:
+                    phrase = cls._literal_of(pattern)
+                    if phrase is None:
+                        residual_hits.setdefault(pattern, []).append((bucket, label))
+                    else:
+                        # Scanned text is lowercased up front, so match lowercase phrases case-sensitively
+                        phrase = phrase.lower()
+                        literal_hits.append((phrase, re.compile(rf"\b{re.escape(phrase)}\b"), bucket, label))
+        
+        # A phrase match also counts every shorter phrase it contains
+        # (e.g. "would appreciate" contains "appreciate"), since the scan consumes the whole phrase
+        vocab = {}
+        for phrase, _, _, _ in literal_hits:
+            if phrase in vocab:
+                continue
+            vocab[phrase] = [
+                (bucket, label)
+                for _, compiled, bucket, label in literal_hits
+                for _ in compiled.finditer(phrase)
             ]
+        
+        # Longest phrases first so the alternation prefers "would appreciate" over "would you"
+        alternation = '|'.join(re.escape(phrase) for phrase in sorted(vocab, key=len, reverse=True))
+        groups = [rf"(?P<word>\b(?:{alternation})\b)"]
+        
+        residual = {}
+        for index, (pattern, hits) in enumerate(residual_hits.items()):
+            name = f"g{index}"
+            groups.append(f"(?P<{name}>{pattern})")
+            residual[name] = hits
+        
+        return vocab, re.compile('|'.join(groups)), residual
+
+    def _scan(self, text, body_start=0):
+        """
+        Score every intent, tone, topic and mark label in one pass over the text
+        
+        Args:
+            text: Lowercased email text
+            body_start: Offset of the body in text; topic hits from there on are its keywords
+        
+        Returns:
+            tuple: ({bucket: {label: match_count}}, body keywords in topic order)
+        """
+        scores = {
+            bucket: dict.fromkeys(pattern_map, 0)
+            for bucket, pattern_map in self._scan_buckets.items()
         }
         
+        # Tally matched strings in C, then fold each distinct one into its buckets,
+        # so the per-match cost involves no Python-level loop body. The few subject
+        # matches (before body_start) come first and are split off, so the body's own
+        # tally shows which topics it mentions
+        found = self._scanner_re.finditer(text)
+        subject_matched = []
+        first_body_match = None
+        for match in found:
+            if match.start() >= body_start:
+                first_body_match = match.group()
+                break
+            subject_matched.append(match.group())
+        
+        counts = Counter(map(re.Match.group, found))
+        if first_body_match is not None:
+            counts[first_body_match] += 1
+        
+        # Only a topic also named in the subject needs the body's matches to be told apart
+        body_matched = None if self._topic_phrases.isdisjoint(subject_matched) else set(counts)
+        for matched in subject_matched:
+            counts[matched] += 1
+        
+        for matched, count in counts.items():
+            hits = self._vocab.get(matched)
+            if hits is None:
+                hits = self._residual[self._scanner_re.fullmatch(matched).lastgroup]
+            for bucket, label in hits:
+                scores[bucket][label] += count
+        
+        keywords = [label for label, count in scores['topic'].items() if count]
+        if body_matched is not None:
+            body_topics = {
+                label
+                for matched in body_matched
+                for bucket, label in self._vocab.get(matched, ())
+                if bucket == 'topic'
+            }
+            keywords = [label for label in keywords if label in body_topics]
+        
+        return scores, tuple(keywords)
+
     def analyze_email(self, subject, body, sender_name=None):
         """
         Analyze email content and return intent, tone, and context
@@ -82,25 +318,17 @@ class EmailAI:
         Returns:
             dict: Analysis results with intent, tone, urgency, and context
         """
-        text = f"{subject} {body}".lower()
-        
-        # Detect intent
-        intent = self._detect_intent(text)
-        
-        # Detect tone
-        tone = self._detect_tone(text)
-        
-        # Detect urgency
-        urgency = self._detect_urgency(text)
+        intent, tone, urgency, has_question, word_count, keywords = self._analyze_cached(subject, body)
         
         # Extract context
         context = {
-            'has_question': bool(re.search(r'\?', text)),
+            'has_question': has_question,
             'sender_name': sender_name or self._extract_name(body),
             'subject': subject,
             'original_body': body,
             'is_urgent': urgency > 0.5,
-            'word_count': len(text.split())
+            'word_count': word_count,
+            'keywords': keywords
         }
         
         return {
@@ -110,75 +338,107 @@ class EmailAI:
             'context': context
         }
     
-    def _detect_intent(self, text):
-        """Detect primary intent of the email"""
-        scores = {}
+    def _analyze_cached(self, subject, body):
+        """
+        Return _analyze_text's result for (subject, body), from an LRU cache when possible
+        """
+        subject_bytes = subject.encode('utf-8', 'surrogatepass')
+        key = hashlib.blake2b(len(subject_bytes).to_bytes(8, 'little'), digest_size=16)
+        key.update(subject_bytes)
+        key.update(body.encode('utf-8', 'surrogatepass'))
+        key = key.digest()
+        
+        with self._analysis_lock:
+            result = self._analysis_cache.get(key)
+            if result is not None:
+                self._analysis_cache.move_to_end(key)
+                return result
+        
+        result = self._analyze_text(subject, body)
+        with self._analysis_lock:
+            self._analysis_cache[key] = result
+            if len(self._analysis_cache) > ANALYSIS_CACHE_SIZE:
+                self._analysis_cache.popitem(last=False)
+        return result
+    
+    def _analyze_text(self, subject, body):
+        """
+        Sender-independent part of analyze_email, memoized by _analyze_cached
         
-        for intent, patterns in self.intent_patterns.items():
-            score = 0
-            for pattern in patterns:
-                matches = len(re.findall(pattern, text, re.IGNORECASE))
-                score += matches
-            scores[intent] = score
+        Returns:
+            tuple: (intent, tone, urgency, has_question, word_count, body keywords)
+        """
+        # One scan over the joined text; the topic hits inside the body are the reply keywords.
+        # Lowercasing can change a string's length, so the subject is lowered before measuring it
+        subject = subject.lower()
+        text = f"{subject} {body.lower()}"
+        scores, keywords = self._scan(text, body_start=len(subject) + 1)
         
-        # Return intent with highest score, default to 'casual'
-        if max(scores.values()) == 0:
-            return 'casual'
+        # Detect intent
+        intent = self._detect_intent(scores['intent'])
         
-        return max(scores, key=scores.get)
-    
-    def _detect_tone(self, text):
-        """Detect tone of the email"""
-        scores = {}
+        # Detect tone
+        tone = self._detect_tone(scores['tone'])
         
-        for tone, patterns in self.tone_indicators.items():
-            score = 0
-            for pattern in patterns:
-                matches = len(re.findall(pattern, text, re.IGNORECASE))
-                score += matches
-            scores[tone] = score
+        # Detect urgency
+        urgency = self._detect_urgency(scores['intent'])
         
+        return intent, tone, urgency, scores['marks']['question'] > 0, len(text.split()), keywords
+    
+    def _detect_intent(self, scores):
+        """Detect primary intent of the email from its per-intent match counts"""
+        # Return intent with highest score, default to 'casual'
+        return self._best_label(scores, 'casual')
+    
+    def _detect_tone(self, scores):
+        """Detect tone of the email from its per-tone match counts"""
         # Return tone with highest score, default to 'professional'
-        if max(scores.values()) == 0:
-            return 'professional'
-        
-        return max(scores, key=scores.get)
+        return self._best_label(scores, 'professional')
+    
+    @staticmethod
+    def _best_label(scores, default):
+        """Single-pass argmax; the first label wins ties, default when nothing matched"""
+        best_label, best_score = default, 0
+        for label, score in scores.items():
+            if score > best_score:
+                best_label, best_score = label, score
+        return best_label
     
-    def _detect_urgency(self, text):
+    def _detect_urgency(self, intent_scores):
         """Calculate urgency score (0.0 to 1.0)"""
-        urgent_count = 0
-        
-        for pattern in self.intent_patterns['urgent']:
-            urgent_count += len(re.findall(pattern, text, re.IGNORECASE))
-        
         # Normalize to 0-1 scale
-        return min(urgent_count / 3.0, 1.0)
+        return min(intent_scores['urgent'] / 3.0, 1.0)
 
     def _extract_name(self, text):
-        """Attempt to extract sender's name from email body"""
-        # Look for common patterns like "Best regards, John" or "Thanks, Sarah"
-        patterns = [
-            r'(?:regards|sincerely|thanks|cheers),?\s+([A-Z][a-z]+)',
-            r'([A-Z][a-z]+)\s+(?:here|speaking|writing)'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text)
-            if match:
-                return match.group(1)
+        """Attempt to extract sender's name from the closing or opening lines of the email body"""
+        # Look for sign-offs like "Best regards, John" or "Thanks, Sarah" in the last lines
+        tail_start = len(text)
+        for _ in range(NAME_SEARCH_LINES):
+            tail_start = text.rfind('\n', 0, tail_start)
+            if tail_start == -1:
+                break
+        
+        match = SIGNOFF_NAME_PATTERN.search(text, tail_start + 1)
+        if match:
+            return match.group(1)
+        
+        # Then for introductions like "Sarah here" in the first lines
+        head_end = -1
+        for _ in range(NAME_SEARCH_LINES):
+            head_end = text.find('\n', head_end + 1)
+            if head_end == -1:
+                head_end = len(text)
+                break
+        
+        match = INTRO_NAME_PATTERN.search(text, 0, head_end)
+        if match:
+            return match.group(1)
         
         return None
 
     def _extract_keywords(self, text):
-        """Extract specific keywords related to the email topic"""
-        found_keywords = []
-        for category, patterns in self.topic_keywords.items():
-            for pattern in patterns:
-                if re.search(pattern, text, re.IGNORECASE):
-                    # Clean the pattern to get the word
-                    word = pattern.replace(r'\b', '').replace('\\', '')
-                    found_keywords.append(word)
-        return list(set(found_keywords))
+        """Extract specific keywords related to the email topic (expects lowercased text)"""
+        return list(self._scan(text)[1])
 
     def _query_ollama(self, subject, body, sender_name):
         """Query local Ollama instance if enabled"""
@@ -201,8 +461,8 @@ class EmailAI:
             4. Do not include subject lines or greetings in your JSON response, just the body text.
             """
             
-            response = requests.post(
-                'http://localhost:11434/api/generate',
+            response = self._http.post(
+                OLLAMA_URL,
                 json={
                     'model': Config.OLLAMA_MODEL,
                     'prompt': prompt,
@@ -239,159 +499,85 @@ class EmailAI:
         # ollama_response = self._query_ollama(context['subject'], context['original_body'], context['sender_name'])
         # if ollama_response: return ollama_response
 
-        # Build response components
-        greeting = self._generate_greeting(tone, context.get('sender_name'))
-        
-        # Generate intelligent body based on extracted keywords
-        keywords = self._extract_keywords(context['original_body'])
-        body = self._generate_contextual_body(intent, tone, context, keywords)
+        plan = self._plans.get((intent, tone)) or self._build_plan(intent, tone)
+        named_greetings, anonymous_greetings, body_templates, closings = plan
         
-        closing = self._generate_closing(tone, context.get('is_urgent', False))
+        # Build response components
+        sender_name = context.get('sender_name')
+        if sender_name:
+            greeting = self._pick(named_greetings, sender=sender_name)
+        else:
+            greeting = self._pick(anonymous_greetings)
+        
+        # Generate intelligent body based on extracted keywords (computed by analyze_email)
+        keywords = context.get('keywords')
+        if keywords is None:
+            keywords = self._extract_keywords(context['original_body'].lower())
+        body = self._pick(body_templates, **self._topic_fields(keywords)) + self._keyword_follow_up(keywords)
+        
+        closing = self._pick(closings)
+        if context.get('is_urgent', False):
+            closing = "I'll be in touch very soon.\n\n" + closing
         
         # Combine components
         response = f"{greeting}\n\n{body}\n\n{closing}"
         
         return response
 
-    def _generate_contextual_body(self, intent, tone, context, keywords):
-        """Generate body text that references specific keywords found in the email"""
+    def _build_plan(self, intent, tone):
+        """
+        Resolve the template pools used to answer an (intent, tone) pair
         
+        Returns:
+            tuple: (named greetings, anonymous greetings, body templates, closings)
+        """
+        return (
+            self._named_greetings.get(tone, self._named_greetings['professional']),
+            self._anonymous_greetings.get(tone, self._anonymous_greetings['professional']),
+            self._contextual_templates.get(intent, self._contextual_templates['casual']),
+            self._closings.get(tone, self._closings['professional'])
+        )
+
+    @staticmethod
+    def _topic_fields(keywords):
+        """Placeholder values that let body templates reference the email's keywords"""
         # Start with a confirmation of understanding
         topic_ref = ""
         if keywords:
             topic_list = ", ".join(keywords[:2])
             topic_ref = f" regarding your message about {topic_list}"
         
-        base_responses = {
-            'question': [
-                f"Thank you for reaching out with your question{topic_ref}. I've received your email and will get back to you with a detailed response shortly.",
-                f"I appreciate your inquiry{topic_ref}. I'm currently reviewing the details and will provide you with a comprehensive answer as soon as possible."
-            ],
-            'request': [
-                f"Thank you for your request{topic_ref}. I've noted the details and will process everything promptly.",
-                f"I've received your message{topic_ref} and am currently looking into it for you."
-            ],
-            'complaint': [
-                f"I sincerely apologize for the inconvenience regarding {keywords[0] if keywords else 'this issue'}. Your concern is important, and I'm investigating this right away.",
-                f"Thank you for bringing this situation{topic_ref} to my attention. I understand your frustration and am working to resolve it quickly."
-            ],
-            'support': [
-                f"Thank you for reaching out for help with {keywords[0] if keywords else 'your inquiry'}. I'm here to assist and will provide guidance shortly.",
-                f"I've received your support request{topic_ref}. I'll get back to you with the technical details you need very soon."
-            ],
-            'casual': [
-                f"Thanks for the email{topic_ref}! I've received your message and will get back to you soon.",
-                f"Got your message{topic_ref}. I'll respond with more details shortly."
-            ]
+        return {
+            'topic_ref': topic_ref,
+            'issue': keywords[0] if keywords else 'this issue',
+            'inquiry': keywords[0] if keywords else 'your inquiry'
         }
-        
-        body = random.choice(base_responses.get(intent, base_responses['casual']))
-        
-        # Add dynamic follow-up based on keywords
+    
+    @staticmethod
+    def _keyword_follow_up(keywords):
+        """Dynamic follow-up sentence based on keywords (empty when none applies)"""
         if 'login' in keywords or 'password' in keywords:
-            body += " For security reasons, please ensure you aren't sharing sensitive credentials in clear text."
+            return " For security reasons, please ensure you aren't sharing sensitive credentials in clear text."
         elif 'meeting' in keywords or 'schedule' in keywords:
-            body += " I'll check my availability and suggest some times that might work for us."
+            return " I'll check my availability and suggest some times that might work for us."
         elif 'invoice' in keywords or 'pricing' in keywords:
-            body += " I'll review our latest records and provide a detailed breakdown for you."
-            
-        return body
-    
-    def _generate_greeting(self, tone, sender_name):
-        """Generate appropriate greeting"""
-        greetings = {
-            'formal': [
-                f"Dear {sender_name}," if sender_name else "Dear Sir/Madam,",
-                f"Hello {sender_name}," if sender_name else "Hello,"
-            ],
-            'friendly': [
-                f"Hi {sender_name}!" if sender_name else "Hi there!",
-                f"Hey {sender_name}!" if sender_name else "Hey!",
-                f"Hello {sender_name}!" if sender_name else "Hello!"
-            ],
-            'professional': [
-                f"Hello {sender_name}," if sender_name else "Hello,",
-                f"Hi {sender_name}," if sender_name else "Hi,"
-            ]
-        }
-        
-        return random.choice(greetings.get(tone, greetings['professional']))
-    
-    def _generate_body(self, intent, tone, context):
-        """Generate response body based on intent and tone"""
-        
-        # Response templates by intent
-        templates = {
-            'question': [
-                "Thank you for reaching out with your question. I've received your email and will get back to you with a detailed response shortly.",
-                "I appreciate your inquiry. I'm currently reviewing your question and will provide you with a comprehensive answer as soon as possible.",
-                "Thanks for your message. I've noted your question and will respond with the information you need very soon."
-            ],
-            'request': [
-                "Thank you for your request. I've received your message and will process it promptly.",
-                "I've received your request and am working on it. You'll hear back from me soon with an update.",
-                "Thanks for reaching out. I'm looking into your request and will get back to you shortly."
-            ],
-            'complaint': [
-                "I sincerely apologize for the inconvenience you've experienced. Your concern is important to me, and I'm looking into this matter right away.",
-                "Thank you for bringing this to my attention. I understand your frustration and am working to resolve this issue as quickly as possible.",
-                "I'm sorry to hear about the problem you're facing. I take this seriously and will investigate immediately to find a solution."
-            ],
-            'support': [
-                "Thank you for reaching out for assistance. I'm here to help and will provide you with the guidance you need shortly.",
-                "I've received your support request and am ready to help. I'll get back to you with detailed assistance very soon.",
-                "Thanks for contacting me. I understand you need help, and I'll provide you with the support you need as quickly as possible."
-            ],
-            'casual': [
-                "Thanks for your email! I've received your message and will get back to you soon.",
-                "Hey! Got your message. I'll respond with more details shortly.",
-                "Thanks for reaching out! I'll get back to you very soon."
-            ],
-            'urgent': [
-                "I understand this is urgent. I've received your message and am prioritizing it. You'll hear from me very soon.",
-                "Thank you for flagging this as urgent. I'm addressing it immediately and will respond as quickly as possible.",
-                "I recognize the urgency of your message. I'm on it and will get back to you right away."
-            ]
-        }
-        
-        # Adjust tone
-        body = random.choice(templates.get(intent, templates['casual']))
-        
-        # Add context-specific information
-        if context.get('has_question'):
-            body += " I'll make sure to address all your questions in my response."
-        
-        if context.get('is_urgent'):
-            body += " I understand the time-sensitive nature of this matter."
-        
-        return body
+            return " I'll review our latest records and provide a detailed breakdown for you."
+        return ""
     
-    def _generate_closing(self, tone, is_urgent):
-        """Generate appropriate closing"""
-        closings = {
-            'formal': [
-                "Sincerely,\nAI Assistant",
-                "Best regards,\nAI Assistant",
-                "Respectfully,\nAI Assistant"
-            ],
-            'friendly': [
-                "Cheers,\nAI Assistant",
-                "Best,\nAI Assistant",
-                "Talk soon,\nAI Assistant"
-            ],
-            'professional': [
-                "Best regards,\nAI Assistant",
-                "Kind regards,\nAI Assistant",
-                "Regards,\nAI Assistant"
-            ]
-        }
-        
-        closing = random.choice(closings.get(tone, closings['professional']))
-        
-        if is_urgent:
-            closing = "I'll be in touch very soon.\n\n" + closing
+    @staticmethod
+    def _pick(templates, **fields):
+        """
+        Choose one template at random and format only that one
         
-        return closing
+        Args:
+            templates: Tuple of template strings
+            **fields: Placeholder values; when omitted the template is returned as-is
+            
+        Returns:
+            str: The chosen, formatted template
+        """
+        template = templates[random.randrange(len(templates))]
+        return template.format(**fields) if fields else template
 
 
 # Singleton instance
@@ -7,7 +7,6 @@ from flask import Flask, request, jsonify, session, send_from_directory
 from flask_cors import CORS
 from datetime import timedelta
 import logging
-import os
 
 from config import Config
 
@@ -25,6 +24,7 @@ logger = logging.getLogger(__name__)
 
 from email_service import EmailService
 from monitor_service import EmailMonitor
+from session_store import SessionStore
 
 # Initialize Flask app
 app = Flask(__name__, static_folder='static')
@@ -32,11 +32,31 @@ app.config['SECRET_KEY'] = Config.SECRET_KEY
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(seconds=Config.SESSION_TIMEOUT)
 
 # Enable CORS
-CORS(app, origins=Config.CORS_ORIGINS, supports_credentials=True)
+CORS(app, origins=list(Config.CORS_ORIGINS), supports_credentials=True)
 
-# Global services (stored per session)
-email_services = {}
-email_monitors = {}
+
+def _close_session(services):
+    """Stop the monitor and disconnect the email service of a logged-out or evicted session"""
+    email_service, monitor = services
+    monitor.stop()
+    email_service.disconnect()
+
+
+def _auto_reply_enabled(services):
+    """Whether a session is still auto-replying, and so must outlive SESSION_TIMEOUT"""
+    return services[1].is_enabled
+
+
+# Global services (stored per session as (EmailService, EmailMonitor)); sessions idle
+# longer than SESSION_TIMEOUT are evicted and closed so abandoned logins don't leak,
+# except while auto-reply is on, which is meant to keep running with the browser closed
+user_sessions = SessionStore(maxsize=1024, ttl=Config.SESSION_TIMEOUT, on_evict=_close_session,
+                             keep_alive=_auto_reply_enabled)
+
+
+def _sid():
+    """Resolve the key used for this session in user_sessions"""
+    return getattr(session, 'sid', None) or session.get('email')
 
 
 @app.route('/')
@@ -94,10 +114,6 @@ def login():
         session['email'] = email_address
         session.permanent = True
         
-        # Store service instances
-        session_id = session.sid if hasattr(session, 'sid') else email_address
-        email_services[session_id] = email_service
-        
         # Create and start monitor
         monitor = EmailMonitor(
             email_service,
@@ -105,7 +121,9 @@ def login():
             max_emails_per_check=Config.MAX_EMAILS_PER_CHECK
         )
         monitor.start()
-        email_monitors[session_id] = monitor
+        
+        # Store service instances
+        user_sessions[_sid()] = (email_service, monitor)
         
         logger.info(f"User logged in: {email_address}")
         
@@ -127,17 +145,8 @@ def login():
 def logout():
     """Logout user and cleanup resources"""
     try:
-        session_id = session.sid if hasattr(session, 'sid') else session.get('email')
-        
-        # Stop monitor
-        if session_id in email_monitors:
-            email_monitors[session_id].stop()
-            del email_monitors[session_id]
-        
-        # Disconnect email service
-        if session_id in email_services:
-            email_services[session_id].disconnect()
-            del email_services[session_id]
+        # Stop monitor and disconnect email service
+        user_sessions.discard(_sid())
         
         email = session.get('email', 'unknown')
         session.clear()
@@ -178,20 +187,11 @@ def get_status():
                 'message': 'Not logged in'
             }), 401
         
-        session_id = session.sid if hasattr(session, 'sid') else session.get('email')
-        
-        email_service = email_services.get(session_id)
-        monitor = email_monitors.get(session_id)
+        email_service, monitor = user_sessions.get(_sid(), (None, None))
         
         if not email_service or not monitor:
             # Try to get some info from disk even if not initialized
-            processed_count = 0
-            if os.path.exists('processed_emails.json'):
-                try:
-                    with open('processed_emails.json', 'r') as f:
-                        processed_count = len(json.load(f))
-                except:
-                    pass
+            processed_count = EmailService.load_processed_count()
             
             return jsonify({
                 'connected': False,
@@ -247,8 +247,7 @@ def toggle_autoreply():
         data = request.get_json()
         enabled = data.get('enabled', False)
         
-        session_id = session.sid if hasattr(session, 'sid') else session.get('email')
-        monitor = email_monitors.get(session_id)
+        _, monitor = user_sessions.get(_sid(), (None, None))
         
         if not monitor:
             return jsonify({
@@ -299,8 +298,7 @@ def get_recent_emails():
         
         limit = request.args.get('limit', 20, type=int)
         
-        session_id = session.sid if hasattr(session, 'sid') else session.get('email')
-        monitor = email_monitors.get(session_id)
+        _, monitor = user_sessions.get(_sid(), (None, None))
         
         if not monitor:
             # Try to load history from disk if monitor is not in memory
@@ -345,8 +343,7 @@ def check_now():
                 'message': 'Not logged in'
             }), 401
         
-        session_id = session.sid if hasattr(session, 'sid') else session.get('email')
-        monitor = email_monitors.get(session_id)
+        _, monitor = user_sessions.get(_sid(), (None, None))
         
         if not monitor:
             return jsonify({
@@ -4,6 +4,7 @@ Handles environment variables and default settings
 """
 
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -17,7 +18,7 @@ class Config:
     DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
     
     # Email monitoring settings
-    MONITOR_INTERVAL = int(os.getenv('MONITOR_INTERVAL', '30'))  # seconds
+    MONITOR_INTERVAL = int(os.getenv('MONITOR_INTERVAL', '30'))  # seconds between checks on servers without IMAP IDLE
     MAX_EMAILS_PER_CHECK = int(os.getenv('MAX_EMAILS_PER_CHECK', '10'))
     
     # AI Settings
@@ -28,28 +29,35 @@ class Config:
     SESSION_TIMEOUT = int(os.getenv('SESSION_TIMEOUT', '3600'))  # 1 hour in seconds
     PERMANENT_SESSION_LIFETIME = SESSION_TIMEOUT
     
-    # CORS settings
-    CORS_ORIGINS = os.getenv('CORS_ORIGINS', 'http://localhost:5001').split(',')
+    # CORS settings (a set: origins are only ever tested for membership)
+    CORS_ORIGINS = frozenset(
+        origin.strip() for origin in os.getenv('CORS_ORIGINS', 'http://localhost:5001').split(',')
+        if origin.strip()
+    )
     
-    # Email provider configurations
+    # Email provider configurations (smtp_port_ssl is the implicit-TLS port, None if
+    # the provider only offers STARTTLS on smtp_port)
     EMAIL_PROVIDERS = {
         'gmail': {
             'imap_server': 'imap.gmail.com',
             'imap_port': 993,
             'smtp_server': 'smtp.gmail.com',
-            'smtp_port': 587
+            'smtp_port': 587,
+            'smtp_port_ssl': 465
         },
         'outlook': {
             'imap_server': 'outlook.office365.com',
             'imap_port': 993,
             'smtp_server': 'smtp.office365.com',
-            'smtp_port': 587
+            'smtp_port': 587,
+            'smtp_port_ssl': None
         },
         'yahoo': {
             'imap_server': 'imap.mail.yahoo.com',
             'imap_port': 993,
             'smtp_server': 'smtp.mail.yahoo.com',
-            'smtp_port': 587
+            'smtp_port': 587,
+            'smtp_port_ssl': 465
         }
     }
     
@@ -60,8 +68,12 @@ class Config:
     @staticmethod
     def get_email_provider(email_address):
         """Detect email provider from email address"""
-        domain = email_address.split('@')[-1].lower()
-        
+        return Config._provider_for_domain(email_address.rsplit('@', 1)[-1].lower())
+    
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _provider_for_domain(domain):
+        """Resolve provider settings for a lowercase domain (cached per domain)"""
         if 'gmail' in domain:
             return Config.EMAIL_PROVIDERS['gmail']
         elif 'outlook' in domain or 'hotmail' in domain or 'live' in domain:
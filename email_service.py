@@ -5,27 +5,94 @@ Handles IMAP (reading) and SMTP (sending) operations
 
 import imaplib
 import smtplib
-import email
+from email import policy
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.header import decode_header
+from email.parser import BytesHeaderParser, BytesParser
 import logging
+import re
+import select
+import ssl
+import time
+from collections import defaultdict
 from datetime import datetime
-import json
-import os
+from functools import lru_cache, partial
 import threading
 
 from config import Config
 from ai_processor import email_ai
 from email_template import generate_html_email, generate_plain_text
+from imap_response import decode_section, split_fetch_response, text_plain_sections
+from processed_store import get_processed_store
+from smtp_pool import SMTPConnectionPool
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Parsers hold no per-message state, so one of each serves every fetch. Headers are
+# read with compat32 (raw values, as the summary fetch sees them); bodies with the
+# modern API for get_body()/get_content()
+_FULL_PARSER = BytesParser(policy=policy.default)
+_HEADER_PARSER = BytesHeaderParser(policy=policy.compat32)
+
+# "Name <email@example.com>": the name is everything before the first '<' and the
+# address runs up to the next '>' (or '<')
+_FROM_RE = re.compile(r'([^<]*)<([^<>]*)')
+
+# Built once: loading the CA bundle is too slow to repeat for every SMTP connection
+_SSL_CONTEXT = ssl.create_default_context()
+
+
+class _UnbufferedIMAP4_SSL(imaplib.IMAP4_SSL):
+    """IMAP4_SSL without a read buffer, so select() on its socket sees every unread byte"""
+    
+    def open(self, *args, **kwargs):
+        super().open(*args, **kwargs)
+        self.file = self.sock.makefile('rb', buffering=0)
+    
+    def read(self, size):
+        # Unbuffered reads may return short; literals must be read in full
+        chunks = []
+        while size > 0:
+            chunk = self.file.read(size)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+
+@lru_cache(maxsize=2048)
+def _decode_encoded_words(header):
+    """Decode a header containing RFC 2047 encoded words (cached: senders and subjects repeat)"""
+    decoded_parts = []
+    
+    for part, encoding in decode_header(header):
+        if isinstance(part, bytes):
+            try:
+                decoded_parts.append(part.decode(encoding or 'utf-8'))
+            except:
+                decoded_parts.append(part.decode('utf-8', errors='ignore'))
+        else:
+            decoded_parts.append(part)
+    
+    return "".join(decoded_parts)
+
 
 class EmailService:
     """Manages email operations via IMAP and SMTP"""
     
+    # Maximum IDs per FETCH command; longer command lines trip server request-size limits
+    FETCH_BATCH_SIZE = 100
+    
+    # What check_new_emails needs up front: the headers it reads plus the MIME layout,
+    # so only the text parts of unprocessed emails are downloaded afterwards
+    SUMMARY_FETCH_ITEMS = '(BODY.PEEK[HEADER.FIELDS (SUBJECT FROM MESSAGE-ID DATE)] BODYSTRUCTURE)'
+    
+    # RFC 2177: servers may drop an IDLE after 30 minutes, so end and re-issue it before then
+    IDLE_TIMEOUT = 28 * 60
+    
     def __init__(self, email_address, app_password):
         """
         Initialize email service
@@ -38,15 +105,30 @@ class EmailService:
         self.app_password = app_password
         self.provider_config = Config.get_email_provider(email_address)
         
+        # (host, port) pairs resolved once rather than on every (re)connect; SMTP
+        # prefers implicit TLS, which saves the plaintext EHLO + STARTTLS round-trips
+        pc = self.provider_config
+        self._imap_endpoint = (pc['imap_server'], pc['imap_port'])
+        self._smtp_implicit_tls = bool(pc.get('smtp_port_ssl'))
+        self._smtp_endpoint = (
+            pc['smtp_server'],
+            pc['smtp_port_ssl'] if self._smtp_implicit_tls else pc['smtp_port']
+        )
+        
         self.imap_connection = None
-        self.smtp_connection = None
         self.is_connected = False
         
         # Thread safety lock
         self.lock = threading.Lock()
         
+        # Logged-in SMTP connections reused across replies; up to SMTP_MAX_CONNECTIONS
+        # sends run at once, under the pool's own lock rather than self.lock
+        self._smtp_pool = SMTPConnectionPool(self._open_smtp)
+        
+        # FETCH batch size, shrunk and remembered if the server rejects a batch as too long
+        self._fetch_batch_size = self.FETCH_BATCH_SIZE
+        
         # Track processed emails to avoid duplicates
-        self.processed_emails_file = 'processed_emails.json'
         self.processed_emails = self._load_processed_emails()
         
     def connect(self):
@@ -58,23 +140,17 @@ class EmailService:
         """
         try:
             # Connect to IMAP
-            logger.info(f"Connecting to IMAP server: {self.provider_config['imap_server']}")
-            self.imap_connection = imaplib.IMAP4_SSL(
-                self.provider_config['imap_server'],
-                self.provider_config['imap_port']
-            )
+            logger.info(f"Connecting to IMAP server: {self._imap_endpoint[0]}")
+            self.imap_connection = imaplib.IMAP4_SSL(*self._imap_endpoint)
             self.imap_connection.login(self.email_address, self.app_password)
             logger.info("IMAP connection successful")
             
-            # Test SMTP connection
-            logger.info(f"Testing SMTP server: {self.provider_config['smtp_server']}")
-            smtp = smtplib.SMTP(
-                self.provider_config['smtp_server'],
-                self.provider_config['smtp_port']
-            )
-            smtp.starttls()
-            smtp.login(self.email_address, self.app_password)
-            smtp.quit()
+            # Log in to SMTP and keep the connection warm for the first reply,
+            # replacing any idle connections left from a previous login
+            logger.info(f"Connecting to SMTP server: {self._smtp_endpoint[0]}")
+            smtp = self._open_smtp()
+            self._smtp_pool.close()
+            self._smtp_pool.put(smtp)
             logger.info("SMTP connection successful")
             
             self.is_connected = True
@@ -114,13 +190,116 @@ class EmailService:
         try:
             if self.imap_connection:
                 self.imap_connection.logout()
-            if self.smtp_connection:
-                self.smtp_connection.quit()
+            self._smtp_pool.close()
             self.is_connected = False
             logger.info("Disconnected from email servers")
         except Exception as e:
             logger.error(f"Error during disconnect: {str(e)}")
     
+    def open_idle_connection(self):
+        """
+        Open a dedicated IMAP connection for IDLE, so searches and fetches on
+        imap_connection are never queued behind a long-running IDLE
+        
+        Returns:
+            IMAP4_SSL: Logged-in connection with INBOX examined, or None if the
+            server does not advertise IDLE
+        """
+        conn = _UnbufferedIMAP4_SSL(*self._imap_endpoint)
+        try:
+            conn.login(self.email_address, self.app_password)
+            
+            # Capabilities can change after authentication, so ask again
+            status, capabilities = conn.capability()
+            if status != 'OK' or b'IDLE' not in capabilities[0].upper().split():
+                logger.info("IMAP server does not support IDLE")
+                conn.logout()
+                return None
+            
+            conn.select('INBOX', readonly=True)
+            return conn
+        except Exception:
+            conn.shutdown()
+            raise
+    
+    def idle_wait(self, conn, timeout=IDLE_TIMEOUT, wakeup=None):
+        """
+        Block in IMAP IDLE until the server pushes new mail
+        
+        Args:
+            conn: Connection from open_idle_connection
+            timeout: Seconds after which IDLE is ended
+            wakeup: Optional socket; IDLE ends early once it becomes readable
+                (the data waiting on it is consumed)
+            
+        Returns:
+            bool: True if the server reported EXISTS (new mail), False otherwise
+        """
+        # imaplib has no IDLE command, so send it by hand and read the replies line by line
+        tag = conn._new_tag()
+        conn.send(tag + b' IDLE\r\n')
+        
+        deadline = time.monotonic() + timeout
+        idling = False
+        new_mail = False
+        
+        while not (idling and new_mail):
+            line = self._idle_readline(conn, deadline, wakeup)
+            if line is None:
+                break
+            
+            if line.startswith(b'+'):
+                idling = True
+            elif line.startswith(tag + b' '):
+                raise imaplib.IMAP4.error(f"IDLE rejected: {line.decode(errors='replace')}")
+            elif line.startswith(b'* BYE'):
+                raise imaplib.IMAP4.abort(f"Server closed IDLE: {line.decode(errors='replace')}")
+            elif line.endswith(b' EXISTS'):
+                new_mail = True
+        
+        # End IDLE and read up to its tagged completion so the connection can IDLE again
+        conn.send(b'DONE\r\n')
+        done_deadline = time.monotonic() + 30
+        while True:
+            line = self._idle_readline(conn, done_deadline)
+            if line is None:
+                raise imaplib.IMAP4.abort("No response to IDLE DONE")
+            if line.startswith(tag + b' '):
+                break
+            if line.endswith(b' EXISTS'):
+                new_mail = True
+        
+        return new_mail
+    
+    def _idle_readline(self, conn, deadline, wakeup=None):
+        """
+        Wait for and read one response line on an IDLE connection
+        
+        Returns:
+            bytes: Line without CRLF, or None at the deadline or once wakeup is readable
+        """
+        sock = conn.sock
+        waitables = [sock] if wakeup is None else [sock, wakeup]
+        
+        # The connection reads unbuffered, so unread data is either in the kernel, where
+        # select() sees it, or already decrypted inside an SSL socket (pending())
+        while not (hasattr(sock, 'pending') and sock.pending()):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            
+            readable = select.select(waitables, [], [], remaining)[0]
+            if wakeup is not None and wakeup in readable:
+                wakeup.recv(4096)
+                return None
+            if readable:
+                break
+        
+        line = conn.readline()
+        if not line:
+            raise imaplib.IMAP4.abort("IDLE connection closed by server")
+        return line.rstrip(b'\r\n')
+    
     def check_new_emails(self, max_emails=10):
         """
         Check for new emails using a robust search strategy
@@ -137,17 +316,25 @@ class EmailService:
         
         try:
             with self.lock:
-                # Select inbox
-                self.imap_connection.select('INBOX')
+                # Select inbox read-only (EXAMINE): fetching never changes flags, and
+                # UIDs below stay valid even if other clients expunge meanwhile
+                self.imap_connection.select('INBOX', readonly=True)
                 
                 # Strategy 1: Search for UNSEEN emails
-                status, unseen_messages = self.imap_connection.search(None, 'UNSEEN')
-                unseen_ids = unseen_messages[0].split() if status == 'OK' else []
-                
                 # Strategy 2: Get recent email IDs (last 20) regardless of seen status
                 # This handles cases where emails are marked as read by other clients
-                status, all_messages = self.imap_connection.search(None, 'ALL')
-                recent_ids = all_messages[0].split()[-20:] if status == 'OK' else []
+                # Both searches are pipelined into one round-trip; ALL always matches at
+                # least as many emails as UNSEEN, which tells the two results apart
+                statuses, results = self._pipeline(
+                    [('UID', ('SEARCH', 'UNSEEN')), ('UID', ('SEARCH', 'ALL'))], 'SEARCH'
+                )
+                results = sorted((result.split() for result in results), key=len)
+                if statuses == ['OK', 'OK'] and len(results) == 2:
+                    unseen_ids, all_ids = results
+                else:
+                    # A search failed, so the reply that came back can't be attributed
+                    unseen_ids = all_ids = results[-1] if results else []
+                recent_ids = all_ids[-20:]
                 
                 # Combine and deduplicate IDs, preserving order (most recent last)
                 # We use a set for efficiency but convert back to sorted list
@@ -159,23 +346,27 @@ class EmailService:
                 
                 # Limit to max_emails, taking the most recent ones
                 email_ids = combined_ids[-max_emails:]
-                logger.info(f"Checking {len(email_ids)} candidate email IDs: {email_ids}")
+                logger.info(f"Checking {len(email_ids)} candidate email UIDs: {email_ids}")
                 
-                new_emails = []
+                # Headers and MIME structure of all candidates in one round-trip; bodies
+                # are then fetched only for the emails that still need a reply
+                summaries = self._fetch_in_batches(email_ids, self._fetch_summary_batch)
+                unprocessed = []
                 
                 for email_id in email_ids:
-                    # We fetch metadata first or just fetch internal to check message_id
-                    email_data = self._fetch_email_internal(email_id)
+                    summary = summaries.get(email_id)
                     
-                    if email_data:
-                        msg_id = email_data['message_id']
+                    if summary:
+                        msg_id = summary[0]['message_id']
                         if msg_id not in self.processed_emails:
-                            logger.info(f"New unprocessed email found: {msg_id} (ID: {email_id.decode()})")
-                            new_emails.append(email_data)
+                            logger.info(f"New unprocessed email found: {msg_id} (UID: {email_id.decode()})")
+                            unprocessed.append(email_id)
                         else:
                             logger.debug(f"Email {msg_id} already in processed set")
                     else:
-                        logger.warning(f"Failed to fetch email data for ID {email_id}")
+                        logger.warning(f"Failed to fetch email data for UID {email_id}")
+                
+                new_emails = self._fetch_bodies(unprocessed, summaries)
                 
                 logger.info(f"Found {len(new_emails)} new unprocessed emails to process")
                 return new_emails
@@ -184,18 +375,227 @@ class EmailService:
             logger.error(f"Error checking emails: {str(e)}")
             return []
     
+    def _fetch_in_batches(self, email_ids, fetch_batch):
+        """
+        Run a FETCH over several emails, one round-trip per batch of IDs
+        
+        Args:
+            email_ids: List of email UIDs (bytes) to fetch
+            fetch_batch: Callable taking a list of UIDs and returning a UID -> result dict
+            
+        Returns:
+            dict: Email UID -> result (UIDs that failed are left out)
+        """
+        fetched = {}
+        start = 0
+        
+        while start < len(email_ids):
+            batch = email_ids[start:start + self._fetch_batch_size]
+            try:
+                fetched.update(fetch_batch(batch))
+            except imaplib.IMAP4.error as e:
+                if 'parse error' not in str(e).lower() or len(batch) == 1:
+                    raise
+                
+                # Command line too long for this server: halve the batch and retry it
+                self._fetch_batch_size = max(1, len(batch) // 2)
+                logger.warning(f"FETCH of {len(batch)} IDs rejected, retrying in batches of {self._fetch_batch_size}")
+                continue
+            
+            start += len(batch)
+        
+        return fetched
+    
+    def _fetch_summary_batch(self, email_ids):
+        """
+        Fetch the headers and text part layout of a batch of emails
+        
+        Args:
+            email_ids: List of email UIDs (bytes) to fetch
+            
+        Returns:
+            dict: Email UID -> (email data without body, text sections or None if
+            BODYSTRUCTURE could not be read)
+        """
+        status, msg_data = self.imap_connection.uid('FETCH', b','.join(email_ids), self.SUMMARY_FETCH_ITEMS)
+        
+        if status != 'OK':
+            logger.error(f"Summary fetch failed for {len(email_ids)} IDs: status={status}")
+            return {}
+        
+        summaries = {}
+        for email_id, items in split_fetch_response(msg_data, by_uid=True):
+            # Servers differ in how they echo the header field list, so match the prefix
+            header = next((value for key, value in items.items() if key.startswith(b'BODY[HEADER')), None)
+            email_data = self._summarize_message(email_id, _HEADER_PARSER.parsebytes(header or b''))
+            if email_data is None:
+                continue
+            
+            try:
+                sections = text_plain_sections(items.get(b'BODYSTRUCTURE'))
+            except (ValueError, IndexError, TypeError) as e:
+                logger.debug(f"Unreadable BODYSTRUCTURE for ID {email_id}: {str(e)}")
+                sections = None
+            
+            summaries[email_id] = (email_data, sections)
+        
+        return summaries
+    
+    def _fetch_section_batch(self, sections, email_ids):
+        """
+        Fetch the same body sections of a batch of emails
+        
+        Args:
+            sections: Section numbers (bytes) to fetch, e.g. (b'1',) or (b'1.1', b'2')
+            email_ids: List of email UIDs (bytes) to fetch
+            
+        Returns:
+            dict: Email UID -> {section: raw bytes or None}
+        """
+        items = ' '.join(f"BODY.PEEK[{section.decode()}]" for section in sections)
+        status, msg_data = self.imap_connection.uid('FETCH', b','.join(email_ids), f"({items})")
+        
+        if status != 'OK':
+            logger.error(f"Body fetch failed for {len(email_ids)} IDs: status={status}")
+            return {}
+        
+        return {
+            email_id: {section: items.get(b'BODY[' + section + b']') for section in sections}
+            for email_id, items in split_fetch_response(msg_data, by_uid=True)
+        }
+    
+    def _pipeline(self, commands, response):
+        """
+        Send IMAP commands back to back and wait for all of them in one round-trip
+        (RFC 3501 section 5.5 allows pipelining commands that don't depend on each other)
+        
+        Args:
+            commands: List of (command name, args tuple)
+            response: Untagged response type to collect, e.g. 'FETCH'
+            
+        Returns:
+            tuple: (statuses in command order, untagged data of all commands combined)
+        """
+        conn = self.imap_connection
+        tags = [conn._command(name, *args) for name, args in commands]
+        
+        statuses = []
+        error = None
+        for (name, _), tag in zip(commands, tags):
+            try:
+                statuses.append(conn._command_complete(name, tag)[0])
+            except imaplib.IMAP4.error as e:
+                # Still read the remaining replies, or they would surface in the next command
+                statuses.append('BAD')
+                error = error or e
+        
+        data = conn._untagged_response('OK', [None], response)[1]
+        if error is not None:
+            raise error
+        
+        return statuses, [item for item in data if item is not None]
+    
+    def _fetch_sections_pipelined(self, by_sections):
+        """
+        Fetch body sections for every section layout and batch in one pipelined round-trip
+        
+        Args:
+            by_sections: Section tuple -> email UIDs (bytes) with that layout
+            
+        Returns:
+            dict: Email UID -> {section: raw bytes or None}
+        """
+        commands = []
+        for sections, ids in by_sections.items():
+            items = ' '.join(f"BODY.PEEK[{section.decode()}]" for section in sections)
+            for start in range(0, len(ids), self._fetch_batch_size):
+                commands.append(('UID', ('FETCH', b','.join(ids[start:start + self._fetch_batch_size]), f"({items})")))
+        
+        if not commands:
+            return {}
+        
+        try:
+            statuses, msg_data = self._pipeline(commands, 'FETCH')
+        except imaplib.IMAP4.error as e:
+            if 'parse error' not in str(e).lower():
+                raise
+            
+            # A command line was too long: redo it one adaptive batch at a time
+            section_data = {}
+            for sections, ids in by_sections.items():
+                section_data.update(self._fetch_in_batches(ids, partial(self._fetch_section_batch, sections)))
+            return section_data
+        
+        if any(status != 'OK' for status in statuses):
+            logger.error(f"Body fetch failed for some IDs: statuses={statuses}")
+        
+        # Replies can be told apart by UID and section, so one parse covers all
+        section_data = {}
+        for email_id, items in split_fetch_response(msg_data, by_uid=True):
+            parts = section_data.setdefault(email_id, {})
+            for key, value in items.items():
+                if key.startswith(b'BODY[') and key.endswith(b']'):
+                    parts[key[5:-1]] = value
+        
+        return section_data
+    
+    def _fetch_bodies(self, email_ids, summaries):
+        """
+        Complete summarized emails with their text, downloading only the text sections
+        
+        Args:
+            email_ids: Email UIDs (bytes) that need a body, in order
+            summaries: Email UID -> (email data without body, text sections or None)
+            
+        Returns:
+            list: Complete email data dictionaries, in email_ids order
+        """
+        # Emails with the same section layout (usually just "1") share FETCH commands
+        by_sections = defaultdict(list)
+        for email_id in email_ids:
+            sections = summaries[email_id][1]
+            if sections:
+                by_sections[tuple(section for section, _, _ in sections)].append(email_id)
+        
+        section_data = self._fetch_sections_pipelined(by_sections)
+        
+        emails = []
+        for email_id in email_ids:
+            email_data, sections = summaries[email_id]
+            
+            if sections is None:
+                # Structure unknown: fall back to downloading the whole message
+                email_data = self._fetch_email_internal(email_id)
+            elif sections and email_id not in section_data:
+                email_data = None
+            else:
+                parts = section_data.get(email_id, {})
+                email_data['body'] = ''.join(
+                    decode_section(parts[section], encoding, charset)
+                    for section, encoding, charset in sections
+                    if parts.get(section) is not None
+                ).strip()
+            
+            if email_data:
+                emails.append(email_data)
+            else:
+                logger.warning(f"Failed to fetch email body for ID {email_id}")
+        
+        return emails
+    
     def _fetch_email_internal(self, email_id):
         """
         Fetch and parse a single email
         
         Args:
-            email_id: Email ID to fetch
+            email_id: Email UID to fetch
             
         Returns:
             dict: Parsed email data
         """
         try:
-            status, msg_data = self.imap_connection.fetch(email_id, '(RFC822)')
+            # BODY.PEEK[] is the whole message like RFC822, without setting \Seen
+            status, msg_data = self.imap_connection.uid('FETCH', email_id, '(BODY.PEEK[])')
             
             if status != 'OK':
                 logger.error(f"Fetch failed for ID {email_id}: status={status}")
@@ -205,10 +605,45 @@ class EmailService:
                 logger.error(f"No message data returned for ID {email_id}")
                 return None
             
-            # Parse email
-            email_body = msg_data[0][1]
-            email_message = email.message_from_bytes(email_body)
+            return self._parse_fetched_message(email_id, msg_data[0][1])
             
+        except Exception as e:
+            logger.error(f"Error fetching email {email_id}: {str(e)}")
+            return None
+    
+    def _parse_fetched_message(self, email_id, email_body):
+        """
+        Parse a raw RFC822 message returned by FETCH
+        
+        Args:
+            email_id: Email ID the message was fetched under
+            email_body: Raw message bytes
+            
+        Returns:
+            dict: Parsed email data
+        """
+        try:
+            email_data = self._summarize_message(email_id, _HEADER_PARSER.parsebytes(email_body))
+            if email_data is not None:
+                email_data['body'] = self._extract_body(_FULL_PARSER.parsebytes(email_body))
+            return email_data
+            
+        except Exception as e:
+            logger.error(f"Error parsing email {email_id}: {str(e)}")
+            return None
+    
+    def _summarize_message(self, email_id, email_message):
+        """
+        Read the headers check_new_emails and process_email need
+        
+        Args:
+            email_id: Email ID the message was fetched under
+            email_message: Parsed message (the body may be absent)
+            
+        Returns:
+            dict: Email data without the body
+        """
+        try:
             # Extract headers
             subject = self._decode_header(email_message['Subject'])
             from_header = self._decode_header(email_message['From'])
@@ -218,9 +653,6 @@ class EmailService:
             # Extract sender name and email
             sender_name, sender_email = self._parse_from_header(from_header)
             
-            # Extract body
-            body = self._extract_body(email_message)
-            
             return {
                 'id': email_id.decode(),
                 'message_id': message_id,
@@ -228,12 +660,11 @@ class EmailService:
                 'from': from_header,
                 'sender_name': sender_name,
                 'sender_email': sender_email,
-                'date': date,
-                'body': body
+                'date': date
             }
             
         except Exception as e:
-            logger.error(f"Error fetching email {email_id}: {str(e)}")
+            logger.error(f"Error parsing email {email_id}: {str(e)}")
             return None
     
     def _decode_header(self, header):
@@ -241,53 +672,49 @@ class EmailService:
         if header is None:
             return ""
         
-        decoded_parts = decode_header(header)
-        decoded_string = ""
+        # Header objects (raw 8-bit headers) are unhashable; decode those uncached
+        if not isinstance(header, str):
+            return _decode_encoded_words.__wrapped__(header)
         
-        for part, encoding in decoded_parts:
-            if isinstance(part, bytes):
-                try:
-                    decoded_string += part.decode(encoding or 'utf-8')
-                except:
-                    decoded_string += part.decode('utf-8', errors='ignore')
-            else:
-                decoded_string += part
+        # Most headers carry no encoded words and decode to themselves
+        if '=?' not in header:
+            return header
         
-        return decoded_string
+        return _decode_encoded_words(header)
     
     def _parse_from_header(self, from_header):
         """Extract name and email from From header"""
-        try:
-            # Parse "Name <email@example.com>" format
-            if '<' in from_header and '>' in from_header:
-                name = from_header.split('<')[0].strip().strip('"')
-                email_addr = from_header.split('<')[1].split('>')[0].strip()
-                return name, email_addr
-            else:
-                return "", from_header.strip()
-        except:
-            return "", from_header
+        match = _FROM_RE.match(from_header)
+        if match is not None and '>' in from_header:
+            return match.group(1).strip().strip('"'), match.group(2).strip()
+        
+        return "", from_header.strip()
     
     def _extract_body(self, email_message):
-        """Extract email body text"""
-        body = ""
+        """Extract email body text (the first inline text/plain part)"""
+        body_part = email_message.get_body(preferencelist=('plain',))
         
-        if email_message.is_multipart():
-            for part in email_message.walk():
-                content_type = part.get_content_type()
-                content_disposition = str(part.get("Content-Disposition"))
-                
-                # Get text/plain parts
-                if content_type == "text/plain" and "attachment" not in content_disposition:
-                    try:
-                        body += part.get_payload(decode=True).decode()
-                    except:
-                        pass
-        else:
-            try:
-                body = email_message.get_payload(decode=True).decode()
-            except:
-                body = str(email_message.get_payload())
+        if body_part is None:
+            # get_body skips e.g. non-start parts of multipart/related; a single-part
+            # message in another type (such as text/html) is used as it is
+            body_part = next(
+                (
+                    part for part in email_message.walk()
+                    if part.get_content_type() == 'text/plain'
+                    and part.get_content_disposition() != 'attachment'
+                ),
+                None if email_message.is_multipart() else email_message
+            )
+            if body_part is None:
+                return ""
+        
+        try:
+            body = body_part.get_content()
+        except Exception:
+            body = body_part.get_payload(decode=True) or b''
+        
+        if isinstance(body, bytes):
+            body = body.decode('utf-8', errors='replace')
         
         return body.strip()
     
@@ -304,10 +731,8 @@ class EmailService:
         Returns:
             bool: True if successful, False otherwise
         """
-        if not self.ensure_connection():
-            logger.error("Could not ensure connection for sending reply")
-            return False
-
+        # No IMAP round-trip or self.lock here: the SMTP pool checks its own
+        # connections, so replies never wait behind a fetch on the IMAP connection
         try:
             # Create message
             msg = MIMEMultipart('alternative')
@@ -331,15 +756,9 @@ class EmailService:
             msg.attach(part1)
             msg.attach(part2)
             
-            # Send email
-            smtp = smtplib.SMTP(
-                self.provider_config['smtp_server'],
-                self.provider_config['smtp_port']
-            )
-            smtp.starttls()
-            smtp.login(self.email_address, self.app_password)
-            smtp.send_message(msg)
-            smtp.quit()
+            # Send email over a pooled connection
+            with self._smtp_pool.with_conn() as smtp:
+                smtp.send_message(msg)
             
             logger.info(f"Reply sent successfully to {to_email}")
             return True
@@ -348,6 +767,17 @@ class EmailService:
             logger.error(f"Error sending reply: {str(e)}")
             return False
     
+    def _open_smtp(self):
+        """Open and authenticate a new SMTP connection for the pool"""
+        if self._smtp_implicit_tls:
+            smtp = smtplib.SMTP_SSL(*self._smtp_endpoint, context=_SSL_CONTEXT)
+        else:
+            smtp = smtplib.SMTP(*self._smtp_endpoint)
+            smtp.starttls(context=_SSL_CONTEXT)
+        
+        smtp.login(self.email_address, self.app_password)
+        return smtp
+    
     def process_email(self, email_data):
         """
         Process an email: analyze with AI and send reply
@@ -411,28 +841,21 @@ class EmailService:
             }
     
     def _load_processed_emails(self):
-        """Load list of processed email IDs"""
-        try:
-            if os.path.exists(self.processed_emails_file):
-                with open(self.processed_emails_file, 'r') as f:
-                    return set(json.load(f))
-        except Exception as e:
-            logger.error(f"Error loading processed emails: {str(e)}")
-        
-        return set()
+        """Open the shared store of processed email IDs"""
+        return get_processed_store()
     
     def _mark_as_processed(self, message_id):
         """Mark an email as processed"""
         self.processed_emails.add(message_id)
-        self._save_processed_emails()
     
-    def _save_processed_emails(self):
-        """Save processed email IDs to file"""
+    @staticmethod
+    def load_processed_count():
+        """Static method to read the processed email count from disk without an instance"""
         try:
-            with open(self.processed_emails_file, 'w') as f:
-                json.dump(list(self.processed_emails), f)
+            return len(get_processed_store())
         except Exception as e:
-            logger.error(f"Error saving processed emails: {str(e)}")
+            logger.error(f"Error loading processed email count: {str(e)}")
+        return 0
     
     def get_status(self):
         """Get current connection status"""
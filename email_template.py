@@ -4,6 +4,17 @@ Creates beautiful, responsive HTML emails with inline CSS
 """
 
 from datetime import datetime
+from functools import lru_cache
+
+# Rendered emails are cached per response text (and subject), since canned replies
+# repeat; only the "Sent on" timestamp differs between sends and is filled in per call
+TEMPLATE_CACHE_SIZE = 256
+_TIMESTAMP_SLOT = '\x00'
+
+
+def _timestamp():
+    return datetime.now().strftime("%B %d, %Y at %I:%M %p")
+
 
 def generate_html_email(response_text, subject="Auto-Reply", sender_name=None):
     """
@@ -17,6 +28,13 @@ def generate_html_email(response_text, subject="Auto-Reply", sender_name=None):
     Returns:
         str: Complete HTML email with inline CSS
     """
+    before, after = _render_html(response_text, subject)
+    return before + _timestamp() + after
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _render_html(response_text, subject):
+    """Render the HTML email, split around the timestamp slot"""
     
     # Split response into paragraphs
     paragraphs = response_text.strip().split('\n\n')
@@ -27,8 +45,8 @@ def generate_html_email(response_text, subject="Auto-Reply", sender_name=None):
         if para.strip():
             paragraph_html += f'<p style="margin: 0 0 16px 0; line-height: 1.6; color: #333333;">{para.strip()}</p>\n'
     
-    # Current timestamp
-    timestamp = datetime.now().strftime("%B %d, %Y at %I:%M %p")
+    # Timestamp is filled in per send
+    timestamp = _TIMESTAMP_SLOT
     
     html_template = f"""
 <!DOCTYPE html>
@@ -128,7 +146,9 @@ def generate_html_email(response_text, subject="Auto-Reply", sender_name=None):
 </html>
 """
     
-    return html_template.strip()
+    # The slot is the last one: only fixed footer text follows it
+    before, _, after = html_template.strip().rpartition(_TIMESTAMP_SLOT)
+    return before, after
 
 
 def generate_plain_text(response_text):
@@ -141,7 +161,14 @@ def generate_plain_text(response_text):
     Returns:
         str: Plain text email
     """
-    timestamp = datetime.now().strftime("%B %d, %Y at %I:%M %p")
+    before, after = _render_plain_text(response_text)
+    return before + _timestamp() + after
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _render_plain_text(response_text):
+    """Render the plain text email, split around the timestamp slot"""
+    timestamp = _TIMESTAMP_SLOT
     
     plain_text = f"""
 CortexMail
@@ -158,4 +185,5 @@ Powered by CortexMail
 This email is based on open source. Improve this open source: https://github.com/apiwishboon-spec/AI-Email-Auto-Reply-System/edit/main/README.md
 """
     
-    return plain_text.strip()
+    before, _, after = plain_text.strip().rpartition(_TIMESTAMP_SLOT)
+    return before, after
@@ -0,0 +1,192 @@
+"""
+IMAP Response Parsing
+Turns imaplib FETCH results into per-message items and walks BODYSTRUCTURE
+"""
+
+import binascii
+import quopri
+import re
+
+# One token of a FETCH response: parentheses, quoted string, literal marker or atom.
+# Atoms may carry a [section] and <partial> suffix, e.g. BODY[HEADER.FIELDS (FROM)]
+_TOKEN_RE = re.compile(
+    rb'\s*(?:(?P<open>\()|(?P<close>\))|"(?P<quoted>(?:[^"\\]|\\.)*)"'
+    rb'|\{(?P<literal>\d+)\}$|(?P<atom>[^\s()"\[\]]+(?:\[[^\]]*\](?:<[\d.]+>)?)?))'
+)
+_QUOTED_ESCAPE_RE = re.compile(rb'\\(.)')
+_MESSAGE_START_RE = re.compile(rb'\d+ \(')
+
+
+def split_fetch_response(msg_data, by_uid=False):
+    """
+    Group the flat list imaplib returns for a FETCH into one entry per message
+
+    Args:
+        msg_data: Data list from IMAP4.fetch or IMAP4.uid('FETCH', ...)
+        by_uid: Key messages by their UID item instead of the message number
+            (UID FETCH replies always carry it, RFC 3501 section 6.4.8)
+
+    Returns:
+        list: (message number or UID as bytes, {ITEM NAME: value}) per message,
+        where values are bytes, None (NIL) or nested lists
+    """
+    messages = []
+    chunks = None
+
+    for item in msg_data:
+        text = item[0] if isinstance(item, tuple) else item
+        if not isinstance(text, bytes):
+            continue
+        if _MESSAGE_START_RE.match(text):
+            chunks = []
+            messages.append(chunks)
+        if chunks is not None:
+            chunks.append(item)
+
+    parsed = []
+    for chunks in messages:
+        tokens = _parse_tokens(chunks)
+        if len(tokens) < 2 or not isinstance(tokens[1], list):
+            continue
+
+        pairs = tokens[1]
+        items = {
+            pairs[i].upper(): pairs[i + 1]
+            for i in range(0, len(pairs) - 1, 2)
+            if isinstance(pairs[i], bytes)
+        }
+        key = items.get(b'UID') if by_uid else tokens[0]
+        if key is not None:
+            parsed.append((key, items))
+
+    return parsed
+
+
+def _parse_tokens(chunks):
+    """Parse one message's chunks (bytes, or (bytes, literal) tuples) into nested lists"""
+    stack = [[]]
+
+    for chunk in chunks:
+        text, literal = chunk if isinstance(chunk, tuple) else (chunk, None)
+
+        for match in _TOKEN_RE.finditer(text):
+            kind = match.lastgroup
+            if kind == 'open':
+                stack.append([])
+            elif kind == 'close':
+                if len(stack) > 1:
+                    closed = stack.pop()
+                    stack[-1].append(closed)
+            elif kind == 'quoted':
+                stack[-1].append(_QUOTED_ESCAPE_RE.sub(rb'\1', match.group('quoted')))
+            elif kind == 'literal':
+                stack[-1].append(literal)
+            elif kind == 'atom':
+                atom = match.group('atom')
+                stack[-1].append(None if atom.upper() == b'NIL' else atom)
+
+    return stack[0]
+
+
+def text_plain_sections(bodystructure):
+    """
+    Find the body section holding the message text
+
+    Mirrors EmailService._extract_body: the first inline text/plain part of a
+    multipart message, or the sole body of a single-part message whatever its type.
+
+    Args:
+        bodystructure: Parsed BODYSTRUCTURE list
+
+    Returns:
+        list: Zero or one (section, transfer encoding, charset) tuple, section as
+        bytes (e.g. b'1.2')
+    """
+    if not isinstance(bodystructure, list) or not bodystructure:
+        raise ValueError("Malformed BODYSTRUCTURE")
+
+    if not isinstance(bodystructure[0], list):
+        return [(b'1', *_encoding_and_charset(bodystructure))]
+
+    sections = []
+    _walk_multipart(bodystructure, b'', sections)
+    return sections
+
+
+def _walk_multipart(node, prefix, sections):
+    """Depth-first search below a multipart node for the first inline text/plain section"""
+    for number, child in enumerate(_children(node), 1):
+        section = prefix + str(number).encode()
+
+        if isinstance(child[0], list):
+            if _walk_multipart(child, section + b'.', sections):
+                return True
+            continue
+
+        media_type = (_lower(child[0]), _lower(child[1]))
+        if media_type == (b'text', b'plain') and not _is_attachment(child):
+            sections.append((section, *_encoding_and_charset(child)))
+            return True
+
+    return False
+
+
+def _children(node):
+    for child in node:
+        if not isinstance(child, list):
+            break
+        yield child
+
+
+def _lower(value):
+    return value.lower() if isinstance(value, bytes) else b''
+
+
+def _encoding_and_charset(part):
+    """Transfer encoding and charset of a single-part body"""
+    encoding = _lower(part[5]) if len(part) > 5 else b''
+
+    charset = None
+    params = part[2] if len(part) > 2 and isinstance(part[2], list) else []
+    for i in range(0, len(params) - 1, 2):
+        if _lower(params[i]) == b'charset' and isinstance(params[i + 1], bytes):
+            charset = params[i + 1].decode('ascii', errors='ignore')
+
+    return encoding, charset
+
+
+def _is_attachment(part):
+    # text/* parts carry a line count, so their disposition sits one slot later
+    disposition = part[9] if len(part) > 9 else None
+    return (
+        isinstance(disposition, list)
+        and bool(disposition)
+        and _lower(disposition[0]) == b'attachment'
+    )
+
+
+def decode_section(data, encoding, charset):
+    """
+    Decode a fetched body section to text
+
+    Args:
+        data: Raw section bytes
+        encoding: Content-Transfer-Encoding from BODYSTRUCTURE (lowercase bytes)
+        charset: Charset parameter, or None
+
+    Returns:
+        str: Decoded text
+    """
+    try:
+        if encoding == b'base64':
+            data = binascii.a2b_base64(data)
+        elif encoding == b'quoted-printable':
+            data = quopri.decodestring(data)
+    except (binascii.Error, ValueError):
+        # Damaged encoding: fall through and decode what the server sent as-is
+        pass
+
+    try:
+        return data.decode(charset or 'utf-8')
+    except (LookupError, UnicodeDecodeError):
+        return data.decode('utf-8', errors='replace')
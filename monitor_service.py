@@ -6,13 +6,33 @@ Background service that periodically checks for new emails
 import threading
 import time
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import json
+from itertools import islice
 import os
+import socket
 import threading
 
+import orjson
+
 logger = logging.getLogger(__name__)
 
+# Processed history is an append-only JSON Lines journal (oldest first), rewritten
+# from memory every HISTORY_COMPACT_INTERVAL appends so it stays about max_recent lines
+HISTORY_FILE = 'processed_history.jsonl'
+LEGACY_HISTORY_FILE = 'processed_history.json'
+HISTORY_COMPACT_INTERVAL = 200
+
+# Emails analyzed and answered concurrently; each spends most of its time waiting on
+# the LLM or SMTP, so a few workers overlap that latency
+PROCESS_WORKERS = 4
+
+# Replies that failed to send are retried on their own schedule, rather than by
+# re-checking the whole inbox, and given up on after FAILED_RETRY_LIMIT attempts
+FAILED_RETRY_INTERVAL = 5 * 60
+FAILED_RETRY_LIMIT = 5
+
 
 class EmailMonitor:
     """Background email monitoring service"""
@@ -33,12 +53,26 @@ class EmailMonitor:
         self.is_running = False
         self.is_enabled = False
         self.monitor_thread = None
+        self._workers = None
+        self._stop_event = threading.Event()  # Wakes the monitor thread's waits on stop()
+        
+        # Written to on stop() and enable/disable, to end an IDLE wait without polling a flag
+        self._wakeup, self._wakeup_signal = socket.socketpair()
+        self._wakeup.setblocking(False)
+        self._wakeup_signal.setblocking(False)
+        self._woken = False  # Set by _wake(), so the IDLE loop can tell a wakeup from a timeout
+        
+        # Emails whose reply failed: Message-ID -> (email data, failed attempts)
+        self._failed = {}
+        self._retry_due = None  # time.monotonic() of the next retry, None when nothing failed
         
         # History persistence
-        self.history_file = 'processed_history.json'
+        self.history_file = HISTORY_FILE
         self.lock = threading.Lock()
-        self.recent_processed = self._load_history()
+        self._history_lock = threading.Lock()  # Serializes journal writes, outside self.lock
         self.max_recent = 50  # Keep last 50 processed emails
+        self.recent_processed = self._load_history()  # Newest first
+        self._appends_since_compact = 0  # Non-zero means the journal needs compacting
         
     def start(self):
         """Start the monitoring service"""
@@ -48,6 +82,8 @@ class EmailMonitor:
         
         self.is_running = True
         self.is_enabled = True
+        self._stop_event.clear()
+        self._workers = ThreadPoolExecutor(max_workers=PROCESS_WORKERS, thread_name_prefix='autoreply')
         self.monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
         self.monitor_thread.start()
         logger.info("Email monitoring started")
@@ -56,38 +92,108 @@ class EmailMonitor:
         """Stop the monitoring service"""
         self.is_running = False
         self.is_enabled = False
+        self._stop_event.set()
+        self._wake()
         if self.monitor_thread:
             self.monitor_thread.join(timeout=5)
+        if self._workers:
+            # Queued emails still run but return at once: _process_email skips
+            # background work while is_enabled is False
+            self._workers.shutdown(wait=False)
+            self._workers = None
+        self._flush_history()
         logger.info("Email monitoring stopped")
     
     def enable(self):
         """Enable auto-reply (monitoring continues but processing is enabled)"""
         self.is_enabled = True
+        self._wake()
         logger.info("Auto-reply enabled")
     
     def disable(self):
         """Disable auto-reply (monitoring continues but processing is paused)"""
         self.is_enabled = False
+        self._wake()
         logger.info("Auto-reply disabled")
     
+    def _wake(self):
+        """Interrupt the monitor thread's IDLE wait so it re-reads is_running/is_enabled"""
+        self._woken = True
+        try:
+            self._wakeup_signal.send(b'\0')
+        except OSError:
+            # Socket buffer full: a wakeup is already pending
+            pass
+    
     def _monitor_loop(self):
-        """Main monitoring loop"""
+        """Main monitoring loop: IMAP IDLE push where supported, polling otherwise"""
         logger.info(f"Monitor loop started (interval: {self.interval}s)")
         
         while self.is_running:
             try:
+                idle_conn = self.email_service.open_idle_connection()
+            except Exception as e:
+                # A connection or login failure, not a server without IDLE: try again
+                logger.warning(f"Could not open IDLE connection, retrying: {str(e)}")
+                self._stop_event.wait(5)
+                continue
+            
+            if idle_conn is None:
+                logger.info("IMAP server does not support IDLE, falling back to polling")
+                self._poll_loop()
+                return
+            
+            try:
+                self._idle_loop(idle_conn)
+            except Exception as e:
+                if self.is_running:
+                    logger.error(f"Error in IDLE loop, reconnecting: {str(e)}")
+                    self._stop_event.wait(5)  # Wait before retrying
+            finally:
+                try:
+                    idle_conn.logout()
+                except Exception:
+                    pass
+    
+    def _idle_loop(self, idle_conn):
+        """Check for mail, then wait in IDLE until the server pushes new mail"""
+        logger.info("Waiting for new emails with IMAP IDLE")
+        
+        check = True
+        while self.is_running:
+            self._woken = False
+            if self.is_enabled:
+                if check:
+                    self._check_and_process()
+                self._retry_failed()
+            
+            # Returns on new mail, when stopped or toggled (so re-enabling auto-reply picks
+            # up mail that arrived while it was off), or at IDLE_TIMEOUT to re-issue IDLE.
+            # A failed reply coming due ends the wait early, to retry just that reply
+            timeout = self.email_service.IDLE_TIMEOUT
+            retry_in = self._seconds_until_retry() if self.is_enabled else None
+            retry_first = retry_in is not None and retry_in < timeout
+            if retry_first:
+                timeout = retry_in
+            
+            new_mail = self.email_service.idle_wait(idle_conn, timeout=timeout, wakeup=self._wakeup)
+            check = new_mail or self._woken or not retry_first
+    
+    def _poll_loop(self):
+        """Check for new emails every interval seconds"""
+        while self.is_running:
+            try:
+                # Each poll re-checks the whole inbox, which also retries failed replies
                 if self.is_enabled:
                     self._check_and_process()
                 
-                # Sleep in small increments to allow quick shutdown
-                for _ in range(self.interval):
-                    if not self.is_running:
-                        break
-                    time.sleep(1)
+                # Returns early as soon as stop() is called
+                if self._stop_event.wait(self.interval):
+                    return
                     
             except Exception as e:
                 logger.error(f"Error in monitor loop: {str(e)}")
-                time.sleep(5)  # Wait before retrying
+                self._stop_event.wait(5)  # Wait before retrying
     
     def check_now(self):
         """
@@ -104,7 +210,6 @@ class EmailMonitor:
         Returns:
             int: Number of emails successfully processed
         """
-        processed_count = 0
         try:
             # Check for new emails
             new_emails = self.email_service.check_new_emails(self.max_emails_per_check)
@@ -113,15 +218,66 @@ class EmailMonitor:
                 return 0
             
             logger.info(f"Processing {len(new_emails)} new emails")
-            
-            # Process each email
-            for email_data in new_emails:
-                if not self.is_enabled and threading.current_thread() == self.monitor_thread:
-                    logger.info("Auto-reply disabled, stopping background processing")
-                    break
+            return self._process_batch(new_emails)
                 
-                result = self.email_service.process_email(email_data)
+        except Exception as e:
+            logger.error(f"Error checking and processing emails: {str(e)}")
+            return 0
+    
+    def _retry_failed(self):
+        """Resend the replies that failed, once their retry is due"""
+        with self.lock:
+            if self._retry_due is None or time.monotonic() < self._retry_due:
+                return
+            self._retry_due = None
+            
+            # Drop any answered since they failed, e.g. by a manual check
+            processed = self.email_service.processed_emails
+            for message_id in [m for m in self._failed if m in processed]:
+                del self._failed[message_id]
+            emails = [email_data for email_data, _ in self._failed.values()]
+        
+        if not emails:
+            return
+        
+        logger.info(f"Retrying {len(emails)} failed replies")
+        try:
+            self._process_batch(emails)
+        except Exception as e:
+            logger.error(f"Error retrying failed replies: {str(e)}")
+    
+    def _seconds_until_retry(self):
+        """Seconds until failed replies are retried, or None if there are none"""
+        with self.lock:
+            if self._retry_due is None:
+                return None
+            return max(self._retry_due - time.monotonic(), 0)
+    
+    def _process_batch(self, emails):
+        """
+        Analyze and reply to emails in parallel
+        
+        Returns:
+            int: Number of emails successfully processed
+        """
+        processed_count = 0
+        
+        # The batch is already capped at max_emails_per_check, so no further queueing is needed
+        background = threading.current_thread() == self.monitor_thread
+        workers = self._workers or ThreadPoolExecutor(max_workers=PROCESS_WORKERS)
+        try:
+            futures = [
+                workers.submit(self._process_email, email_data, background)
+                for email_data in emails
+            ]
+            
+            # Collect in fetch order so the recent list matches the inbox order
+            for email_data, future in zip(emails, futures):
+                result = future.result()
                 
+                if result is None:
+                    continue
+                self._track_failure(email_data, result['success'])
                 if result['success']:
                     # Add to recent processed list
                     self._add_to_recent(result)
@@ -129,63 +285,162 @@ class EmailMonitor:
                     logger.info(f"Successfully processed email from {result['sender']}")
                 else:
                     logger.error(f"Failed to process email: {result.get('error', 'Unknown error')}")
-                
-                # Small delay between processing emails
-                time.sleep(1)
+        finally:
+            if workers is not self._workers:
+                workers.shutdown()
+        
+        return processed_count
+    
+    def _track_failure(self, email_data, success):
+        """Record a reply's outcome, scheduling a retry if it failed"""
+        message_id = email_data['message_id']
+        with self.lock:
+            if success:
+                self._failed.pop(message_id, None)
+                return
             
-            return processed_count
-                
-        except Exception as e:
-            logger.error(f"Error checking and processing emails: {str(e)}")
-            return 0
+            _, attempts = self._failed.pop(message_id, (None, 0))
+            attempts += 1
+            if attempts >= FAILED_RETRY_LIMIT:
+                logger.error(f"Giving up on email {message_id} after {attempts} failed replies")
+                return
+            
+            self._failed[message_id] = (email_data, attempts)
+            if self._retry_due is None:
+                self._retry_due = time.monotonic() + FAILED_RETRY_INTERVAL
+    
+    def _process_email(self, email_data, background):
+        """
+        Worker task: analyze and reply to one email
+        
+        Returns:
+            dict: Processing result, or None if skipped because auto-reply was disabled
+        """
+        if background and not self.is_enabled:
+            logger.info("Auto-reply disabled, skipping background processing")
+            return None
+        
+        return self.email_service.process_email(email_data)
     
     def _add_to_recent(self, result):
         """Add processed email to recent list and persist"""
         with self.lock:
-            self.recent_processed.insert(0, result)
+            # The deque's maxlen drops the oldest entry once max_recent is reached
+            self.recent_processed.appendleft(result)
             
-            # Keep only the most recent
-            if len(self.recent_processed) > self.max_recent:
-                self.recent_processed = self.recent_processed[:self.max_recent]
+            self._appends_since_compact += 1
+            if self._appends_since_compact >= HISTORY_COMPACT_INTERVAL:
+                snapshot = self._compaction_snapshot()
+            else:
+                snapshot = None
             
-            self._save_history()
+            # Take the file lock before releasing self.lock so journal writes keep the
+            # order of the updates, while readers of recent_processed never wait on disk
+            self._history_lock.acquire()
+        
+        try:
+            if snapshot is None:
+                self._append_history(result)
+            else:
+                self._save_history(snapshot)
+        finally:
+            self._history_lock.release()
+    
+    def _flush_history(self):
+        """Compact the journal if anything was appended since the last compaction"""
+        with self.lock:
+            if not self._appends_since_compact:
+                return
+            snapshot = self._compaction_snapshot()
+            self._history_lock.acquire()
+        
+        try:
+            self._save_history(snapshot)
+        finally:
+            self._history_lock.release()
+    
+    def _compaction_snapshot(self):
+        """Copy the entries to compact and reset the append count (caller holds self.lock)"""
+        self._appends_since_compact = 0
+        return list(self.recent_processed)
     
     def _load_history(self):
         """Load processed history from file"""
         try:
             if os.path.exists(self.history_file):
-                with open(self.history_file, 'r') as f:
-                    data = json.load(f)
-                    logger.info(f"Loaded {len(data)} history entries from {self.history_file}")
-                    return data
-        except json.JSONDecodeError:
-            logger.error(f"Error decoding {self.history_file}, possibly corrupted. Resetting history.")
-            # Backup corrupted file
-            if os.path.exists(self.history_file):
-                os.rename(self.history_file, f"{self.history_file}.bak")
+                history = self._read_history_tail(self.history_file, self.max_recent)
+                logger.info(f"Loaded {len(history)} history entries from {self.history_file}")
+                return deque(history, maxlen=self.max_recent)
+            
+            # One-time migration from the old single-array JSON file (stored newest first)
+            if os.path.exists(LEGACY_HISTORY_FILE):
+                with open(LEGACY_HISTORY_FILE, 'rb') as f:
+                    history = deque(orjson.loads(f.read()), maxlen=self.max_recent)
+                self._save_history(list(history))
+                os.rename(LEGACY_HISTORY_FILE, f"{LEGACY_HISTORY_FILE}.bak")
+                logger.info(f"Migrated {len(history)} history entries from {LEGACY_HISTORY_FILE}")
+                return history
         except Exception as e:
             logger.error(f"Unexpected error loading processed history: {str(e)}")
         
-        return []
+        return deque(maxlen=self.max_recent)
     
-    def _save_history(self):
-        """Save processed history to file"""
+    def _append_history(self, result):
+        """Append a single processed email to the history journal"""
+        try:
+            with open(self.history_file, 'ab') as f:
+                f.write(orjson.dumps(result) + b'\n')
+        except Exception as e:
+            logger.error(f"Error saving processed history: {str(e)}")
+    
+    def _save_history(self, entries):
+        """
+        Replace the history journal with the given entries
+        
+        Args:
+            entries: Entries to keep, newest first
+        """
+        # Write a temp file and rename it over the journal, so a crash mid-write
+        # leaves the previous journal intact instead of a truncated one
+        tmp_file = f"{self.history_file}.tmp"
         try:
-            with open(self.history_file, 'w') as f:
-                json.dump(self.recent_processed, f)
-            logger.debug(f"Saved {len(self.recent_processed)} history entries to {self.history_file}")
+            with open(tmp_file, 'wb') as f:
+                f.write(b''.join(orjson.dumps(entry) + b'\n' for entry in reversed(entries)))
+            os.replace(tmp_file, self.history_file)
+            logger.debug(f"Saved {len(entries)} history entries to {self.history_file}")
         except Exception as e:
             logger.error(f"Error saving processed history: {str(e)}")
     
+    @staticmethod
+    def _read_history_tail(history_file, limit):
+        """
+        Read the newest entries of a history journal
+        
+        Args:
+            history_file: Path of the JSON Lines journal
+            limit: Maximum number of entries to return
+            
+        Returns:
+            list: Entries, newest first
+        """
+        with open(history_file, 'rb') as f:
+            lines = deque(f, maxlen=limit)
+        
+        history = []
+        for line in reversed(lines):
+            try:
+                history.append(orjson.loads(line))
+            except orjson.JSONDecodeError:
+                # A torn final line from a crash mid-append only loses that entry
+                logger.warning(f"Skipping corrupted line in {history_file}")
+        return history
+    
     @staticmethod
     def load_recent_history(limit=20):
         """Static method to load history from disk without an instance"""
-        history_file = 'processed_history.json'
         try:
-            if os.path.exists(history_file):
-                with open(history_file, 'r') as f:
-                    history = json.load(f)
-                    return history[:limit]
+            if os.path.exists(HISTORY_FILE):
+                return EmailMonitor._read_history_tail(HISTORY_FILE, limit)
         except Exception as e:
             logger.error(f"Error loading processed history statically: {str(e)}")
         return []
@@ -204,7 +459,7 @@ class EmailMonitor:
             # If memory is empty but we have a file, reload just in case
             if not self.recent_processed and os.path.exists(self.history_file):
                 self.recent_processed = self._load_history()
-            return self.recent_processed[:limit]
+            return list(islice(self.recent_processed, limit))
     def get_status(self):
         """Get monitor status"""
         with self.lock:
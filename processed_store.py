@@ -0,0 +1,158 @@
+"""
+Processed Email Store
+Persists digests of the Message-IDs that already received an auto-reply in SQLite
+"""
+
+import functools
+import hashlib
+import logging
+import math
+import os
+import sqlite3
+import threading
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+PROCESSED_DB_FILE = 'processed_emails.db'
+LEGACY_PROCESSED_FILE = 'processed_emails.json'
+
+# Bloom filter sizing: it is rebuilt at twice the row count whenever it fills up
+BLOOM_INITIAL_CAPACITY = 10000
+BLOOM_ERROR_RATE = 1e-6
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over 64-bit digests (no false negatives, tunable false positives)"""
+
+    def __init__(self, capacity, error_rate):
+        """
+        Size the bit array for capacity items at the given false-positive rate
+
+        Args:
+            capacity: Number of items the filter is sized for
+            error_rate: False-positive probability once capacity items are added
+        """
+        self.capacity = capacity
+        self.num_bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, key):
+        # Keys are already uniform 64-bit digests: double hashing over their two halves
+        h1 = key & 0xFFFFFFFF
+        h2 = (key >> 32) & 0xFFFFFFFF | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, key):
+        bits = self._bits
+        for pos in self._positions(key):
+            bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+def _normalize_message_id(message_id):
+    """Canonical Message-ID: no surrounding whitespace or angle brackets, lowercase"""
+    # Emails without a Message-ID share one key, as they shared None in the old set
+    return (message_id or '').strip().strip('<>').lower()
+
+
+def _digest(message_id):
+    """Signed 64-bit digest of the normalized Message-ID (fits a SQLite INTEGER key)"""
+    digest = hashlib.blake2b(
+        _normalize_message_id(message_id).encode('utf-8', 'surrogatepass'), digest_size=8
+    ).digest()
+    return int.from_bytes(digest, 'little', signed=True)
+
+
+class ProcessedEmailStore:
+    """Set-like store of processed Message-IDs backed by a SQLite table of digests"""
+
+    def __init__(self, db_file, legacy_file=None):
+        """
+        Open (or create) the store
+
+        Args:
+            db_file: SQLite database path
+            legacy_file: Old JSON array of Message-IDs to import once (optional)
+        """
+        self.db_file = db_file
+        self._lock = threading.Lock()
+
+        # Autocommit connection shared by the monitor and request threads (guarded by _lock)
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS processed_digests (digest INTEGER PRIMARY KEY)')
+
+        if legacy_file and os.path.exists(legacy_file):
+            self._import_legacy(legacy_file)
+
+        self._count = self._conn.execute('SELECT COUNT(*) FROM processed_digests').fetchone()[0]
+        self._rebuild_filter()
+
+    def __contains__(self, message_id):
+        key = _digest(message_id)
+        with self._lock:
+            # A Bloom miss is definitive, so new mail never touches the database;
+            # a hit is confirmed against the table to rule out false positives
+            if key not in self._filter:
+                return False
+
+            row = self._conn.execute(
+                'SELECT 1 FROM processed_digests WHERE digest = ?', (key,)
+            ).fetchone()
+            return row is not None
+
+    def add(self, message_id):
+        """Record a Message-ID as processed"""
+        key = _digest(message_id)
+        with self._lock:
+            cursor = self._conn.execute(
+                'INSERT OR IGNORE INTO processed_digests (digest) VALUES (?)', (key,)
+            )
+            self._count += cursor.rowcount
+
+            if self._count > self._filter.capacity:
+                self._rebuild_filter()
+            else:
+                self._filter.add(key)
+
+    def __len__(self):
+        return self._count
+
+    def _rebuild_filter(self):
+        """Load every stored ID into a filter sized with headroom for new ones"""
+        self._filter = BloomFilter(
+            max(BLOOM_INITIAL_CAPACITY, 2 * self._count), BLOOM_ERROR_RATE
+        )
+        for (key,) in self._conn.execute('SELECT digest FROM processed_digests'):
+            self._filter.add(key)
+
+    def _import_legacy(self, legacy_file):
+        """Move IDs from the old JSON file into the table and keep the file as a backup"""
+        try:
+            with open(legacy_file, 'rb') as f:
+                message_ids = orjson.loads(f.read())
+
+            # One transaction for the whole import rather than one per row
+            with self._conn:
+                self._conn.execute('BEGIN')
+                self._conn.executemany(
+                    'INSERT OR IGNORE INTO processed_digests (digest) VALUES (?)',
+                    ((_digest(message_id),) for message_id in message_ids)
+                )
+            os.replace(legacy_file, f"{legacy_file}.bak")
+            logger.info(f"Imported {len(message_ids)} processed email IDs from {legacy_file}")
+        except Exception as e:
+            logger.error(f"Error importing processed emails from {legacy_file}: {str(e)}")
+
+
+@functools.lru_cache(maxsize=None)
+def get_processed_store(db_file=PROCESSED_DB_FILE):
+    """Process-wide store for db_file, shared by every EmailService"""
+    return ProcessedEmailStore(db_file, legacy_file=LEGACY_PROCESSED_FILE)
@@ -0,0 +1,121 @@
+"""
+Session Store Module
+Bounded, idle-expiring registry of per-session resources
+"""
+
+import threading
+import time
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Threads releasing evicted sessions; each release may wait seconds on a monitor
+# thread and on IMAP/SMTP logouts
+RELEASE_WORKERS = 2
+
+
+class SessionStore:
+    """LRU mapping of session id -> value that releases values when they are evicted"""
+
+    def __init__(self, maxsize, ttl, on_evict, keep_alive=None):
+        """
+        Initialize session store
+
+        Args:
+            maxsize: Maximum number of live sessions
+            ttl: Seconds a session may stay idle before it is evicted
+            on_evict: Callback invoked with each evicted value (on a release thread,
+                except for values removed with discard)
+            keep_alive: Optional predicate; values it holds true for are never expired
+                for being idle, only evicted when maxsize is exceeded
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.keep_alive = keep_alive
+
+        # key -> (value, last_access), least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Evictions happen inside unrelated requests, so their values are released here
+        self._releaser = ThreadPoolExecutor(max_workers=RELEASE_WORKERS, thread_name_prefix='session-release')
+
+    def get(self, key, default=None):
+        """Return the value for key and mark it as recently used"""
+        now = time.monotonic()
+        with self._lock:
+            evicted = self._expire(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (entry[0], now)
+                self._entries.move_to_end(key)
+
+        self._release_in_background(evicted)
+        return entry[0] if entry is not None else default
+
+    def __setitem__(self, key, value):
+        now = time.monotonic()
+        with self._lock:
+            evicted = self._expire(now)
+
+            # Replacing a session (e.g. logging in again) releases the previous value
+            previous = self._entries.pop(key, None)
+            if previous is not None and previous[0] is not value:
+                evicted.append(previous[0])
+
+            self._entries[key] = (value, now)
+            while len(self._entries) > self.maxsize:
+                evicted.append(self._entries.popitem(last=False)[1][0])
+
+        self._release_in_background(evicted)
+
+    def discard(self, key):
+        """Remove key if present and release its value before returning"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+
+        if entry is not None:
+            self._release([entry[0]])
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _expire(self, now):
+        """Pop entries idle for longer than ttl, unless kept alive (caller holds the lock)"""
+        evicted = []
+        cutoff = now - self.ttl
+
+        while self._entries:
+            key, (value, last_access) = next(iter(self._entries.items()))
+            if last_access > cutoff:
+                break
+            if self.keep_alive is not None and self.keep_alive(value):
+                # Treat it as just used, so the scan moves on and it is not re-checked until ttl
+                self._entries[key] = (value, now)
+                self._entries.move_to_end(key)
+                continue
+            del self._entries[key]
+            evicted.append(value)
+
+        return evicted
+
+    def _release_in_background(self, values):
+        """Hand evicted values to the release threads so the calling request never waits"""
+        if values:
+            self._releaser.submit(self._release, values)
+
+    def _release(self, values):
+        """Run on_evict outside the lock, since closing sockets and threads can block"""
+        for value in values:
+            try:
+                self.on_evict(value)
+            except Exception as e:
+                logger.error(f"Error releasing evicted session: {str(e)}")
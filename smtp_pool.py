@@ -0,0 +1,106 @@
+"""
+SMTP Connection Pool
+Reuses logged-in SMTP connections across replies instead of reconnecting per send
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Servers drop idle sessions after a few minutes; recycle well before that
+SMTP_IDLE_TIMEOUT = 60
+
+# Concurrent sessions per account; providers throttle or refuse beyond a handful
+SMTP_MAX_CONNECTIONS = 4
+
+
+class SMTPConnectionPool:
+    """Pool of authenticated SMTP connections built on demand by a factory"""
+
+    def __init__(self, factory, max_size=SMTP_MAX_CONNECTIONS, idle_timeout=SMTP_IDLE_TIMEOUT):
+        """
+        Initialize connection pool
+
+        Args:
+            factory: Callable returning a connected, logged-in smtplib.SMTP
+            max_size: Maximum connections in use (and kept idle) at once
+            idle_timeout: Seconds an idle connection may be reused for
+        """
+        self.factory = factory
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+
+        # One slot per connection in use; senders beyond max_size wait for a slot
+        self._slots = threading.BoundedSemaphore(max_size)
+
+        # Idle connections as (smtp, returned_at), most recently returned last
+        self._idle = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def with_conn(self):
+        """
+        Borrow a live connection for the duration of the with block
+
+        Connections that raise inside the block are closed rather than returned.
+        """
+        with self._slots:
+            smtp = self._acquire()
+            try:
+                yield smtp
+            except Exception:
+                self._close(smtp)
+                raise
+            else:
+                self.put(smtp)
+
+    def put(self, smtp):
+        """Add an open, logged-in connection to the idle set (closed if the set is full)"""
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append((smtp, time.monotonic()))
+                return
+
+        self._close(smtp)
+
+    def _acquire(self):
+        """Return the freshest idle connection that still answers NOOP, else a new one"""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                smtp, returned_at = self._idle.pop()
+
+            if time.monotonic() - returned_at > self.idle_timeout:
+                self._close(smtp)
+                continue
+
+            try:
+                if smtp.noop()[0] == 250:
+                    return smtp
+            except Exception:
+                pass
+            self._close(smtp)
+
+        return self.factory()
+
+    def close(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+
+        for smtp, _ in idle:
+            self._close(smtp)
+
+    @staticmethod
+    def _close(smtp):
+        try:
+            smtp.quit()
+        except Exception:
+            try:
+                smtp.close()
+            except Exception as e:
+                logger.debug(f"Error closing SMTP connection: {str(e)}")
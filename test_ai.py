@@ -32,5 +32,15 @@ def test_ai():
         
         print(f"Generated Response:\n{'-'*20}\n{response}\n{'-'*20}\n")
 
+def test_subject_body_join():
+    # "would you" split across subject and body still counts (question wins the tie)
+    assert email_ai._analyze_text("Would", "you")[0] == 'question'
+    
+    # Keywords come from the body only
+    assert email_ai._analyze_text("Login error", "The invoice is wrong")[5] == ('invoice',)
+    assert email_ai._analyze_text("Login error", "Still no login")[5] == ('login',)
+    assert email_ai._analyze_text("Login error", "Login error again")[5] == ('error', 'login')
+
 if __name__ == "__main__":
     test_ai()
+    test_subject_body_join()
@@ -0,0 +1,73 @@
+from imap_response import decode_section, split_fetch_response, text_plain_sections
+
+
+def _bodystructure(text):
+    """Parse a BODYSTRUCTURE the way it arrives inside a FETCH response"""
+    return split_fetch_response([b'1 (BODYSTRUCTURE ' + text + b')'])[0][1][b'BODYSTRUCTURE']
+
+
+def test_literals_split_across_tuples():
+    # imaplib returns one (prefix, literal) tuple per literal and the closing text separately
+    msg_data = [
+        (b'1 (UID 5 BODY[1] {5}', b'hello'),
+        (b' BODY[2] {3}', b'abc'),
+        b')',
+        (b'2 (BODY[1] {2}', b'hi'),
+        b')',
+    ]
+
+    assert split_fetch_response(msg_data) == [
+        (b'1', {b'UID': b'5', b'BODY[1]': b'hello', b'BODY[2]': b'abc'}),
+        (b'2', {b'BODY[1]': b'hi'}),
+    ]
+
+
+def test_uid_after_literal():
+    msg_data = [(b'2 (BODY[1] {2}', b'hi'), b' UID 42 FLAGS (\\Seen))']
+
+    assert split_fetch_response(msg_data, by_uid=True) == [
+        (b'42', {b'BODY[1]': b'hi', b'UID': b'42', b'FLAGS': [b'\\Seen']}),
+    ]
+
+
+def test_nil_and_quoted_escapes():
+    msg_data = [b'3 (UID 7 X-NAME "a \\"q\\" \\\\b" X-EMPTY NIL)']
+
+    assert split_fetch_response(msg_data) == [
+        (b'3', {b'UID': b'7', b'X-NAME': b'a "q" \\b', b'X-EMPTY': None}),
+    ]
+
+
+def test_nested_multipart_with_attachment():
+    # mixed: [alternative: [text/plain, text/html], text/plain attachment]
+    bodystructure = _bodystructure(
+        b'((("text" "plain" ("charset" "iso-8859-1") NIL NIL "base64" 10 1 NIL NIL NIL)'
+        b'("text" "html" NIL NIL NIL "7bit" 5 1 NIL NIL NIL) "alternative")'
+        b'("text" "plain" NIL NIL NIL "7bit" 4 1 NIL ("attachment" ("filename" "a.txt")) NIL) "mixed")'
+    )
+    assert text_plain_sections(bodystructure) == [(b'1.1', b'base64', 'iso-8859-1')]
+
+    # An attached text/plain ahead of the inline one is skipped
+    bodystructure = _bodystructure(
+        b'(("text" "plain" NIL NIL NIL "7bit" 4 1 NIL ("attachment" ("filename" "a.txt")) NIL)'
+        b'("text" "plain" ("charset" "utf-8") NIL NIL "8bit" 4 1 NIL NIL NIL) "mixed")'
+    )
+    assert text_plain_sections(bodystructure) == [(b'2', b'8bit', 'utf-8')]
+
+
+def test_single_part_and_decoding():
+    bodystructure = _bodystructure(b'("text" "html" ("charset" "utf-8") NIL NIL "quoted-printable" 9 1 NIL NIL NIL)')
+    section, encoding, charset = text_plain_sections(bodystructure)[0]
+
+    assert section == b'1'
+    assert decode_section(b'caf=C3=A9', encoding, charset) == 'café'
+    assert decode_section(b'aGVsbG8=', b'base64', None) == 'hello'
+
+
+if __name__ == "__main__":
+    test_literals_split_across_tuples()
+    test_uid_after_literal()
+    test_nil_and_quoted_escapes()
+    test_nested_multipart_with_attachment()
+    test_single_part_and_decoding()
+    print("All IMAP response tests passed")